@@ -0,0 +1,248 @@
+import warnings
+import numpy as np
+from tequila.hamiltonian.qubit_hamiltonian import QubitHamiltonian
+from tequila.utils.exceptions import TequilaWarning
+
+from compile_cache import structural_key
+from gate_matrices import gate_matrix
+
+
+def _apply_batch(psi: np.ndarray, positions: list, matrices: np.ndarray) -> np.ndarray:
+    """Applies one gate to a batch of states of shape (N, 2, ..., 2). matrices has shape (d, d),
+    if the gate is the same for all the states, or (N, d, d)."""
+    n = psi.ndim - 1
+    k = len(positions)
+    axes = [1 + p for p in positions]
+    moved = np.moveaxis(psi, axes, list(range(n + 1 - k, n + 1)))
+    shape = moved.shape
+    moved = moved.reshape(shape[0], -1, 2**k)
+    if matrices.ndim == 2:
+        moved = moved @ matrices.T
+    else:
+        moved = np.einsum("bij,brj->bri", matrices, moved)
+    return np.moveaxis(moved.reshape(shape), list(range(n + 1 - k, n + 1)), axes)
+
+
+def _permute_rows(array: np.ndarray, order: list):
+    """Moves in place the row k of array to the row order[k], following the cycles of the
+    permutation so that at most two rows are copied at a time."""
+    done = [False]*len(order)
+    for k in range(len(order)):
+        if done[k] or order[k] == k:
+            continue
+        carried = array[k].copy()
+        p = k
+        while True:
+            done[p] = True
+            q = order[p]
+            if q == k:
+                array[k] = carried
+                break
+            replaced = array[q].copy()
+            array[q] = carried
+            carried = replaced
+            p = q
+
+
+def simulate_batch(circuits: list, qubits: list = None, variables: dict = None, dtype=np.complex128,
+                   block_size: int = 2**20) -> np.ndarray:
+    """Function that simulates a list of circuits holding all the wavefunctions in one (N, 2**n) array.
+    Circuits with the same structure (same gates up to their angles, see `structural_key`)
+    are simulated together: each gate is applied to the whole batch with one vectorized operation.
+    Every group is simulated in place in the output array, blocks of rows of at most block_size amplitudes
+    at a time, so that the temporary arrays of a gate do not grow with the number of circuits.
+
+    Args:
+        circuits (list): list of circuits.
+        qubits (list, optional): qubits of the wavefunctions, the first one being the most significant.
+                                 Defaults to the sorted qubits of the circuits.
+        variables (dict, optional): Dictionary with the values of the variables of the circuits. Defaults to None.
+        dtype (optional): numpy complex type of the wavefunctions. Defaults to np.complex128.
+        block_size (int, optional): number of amplitudes a gate is applied to at a time. Defaults to 2**20.
+
+    Returns:
+        np.ndarray: array of shape (N, 2**n) whose rows are the wavefunctions of the circuits.
+    """
+    if qubits is None:
+        qubits = sorted(set(q for U in circuits for q in U.qubits))
+    position = {q: k for k, q in enumerate(qubits)}
+    n = len(qubits)
+    rows = max(1, block_size // 2**n)
+
+    groups = {}
+    for i, U in enumerate(circuits):
+        groups.setdefault(structural_key(U), []).append(i)
+
+    wavefunctions = np.zeros([len(circuits), 2**n], dtype=dtype)
+    start = 0
+    for indices in groups.values():
+        group = wavefunctions[start:start+len(indices)]
+        group[:, 0] = 1.0
+        for g in range(len(circuits[indices[0]].gates)):
+            gates = [circuits[i].gates[g] for i in indices]
+            gate_qubits, matrix = gate_matrix(gates[0], variables)
+            if gates[0].is_parameterized():
+                matrices = np.array([gate_matrix(gate, variables)[1] for gate in gates], dtype=dtype)
+            else:
+                matrices = matrix.astype(dtype)
+            for r in range(0, len(indices), rows):
+                psi = group[r:r+rows].reshape([-1] + [2]*n)
+                block_matrices = matrices[r:r+rows] if matrices.ndim == 3 else matrices
+                if len(gate_qubits) == 0:
+                    psi *= block_matrices.reshape([-1] + [1]*n)
+                else:
+                    psi[...] = _apply_batch(psi, [position[q] for q in gate_qubits], block_matrices)
+        start += len(indices)
+
+    # the groups are stored one after the other, row k holds the circuit order[k]
+    order = [i for indices in groups.values() for i in indices]
+    _permute_rows(wavefunctions, order)
+
+    return wavefunctions
+
+
+def _parity(values: np.ndarray) -> np.ndarray:
+    """Parity of the number of set bits of non-negative integers smaller than 2**64."""
+    values = values.copy()
+    for shift in [32, 16, 8, 4, 2, 1]:
+        values ^= values >> shift
+    return values & 1
+
+
+def apply_hamiltonian(wavefunctions: np.ndarray, H: QubitHamiltonian, qubits: list, start: int = 0,
+                      stop: int = None, block_size: int = 2**16) -> np.ndarray:
+    """Function that applies an operator to a batch of wavefunctions, one Pauli string at a time:
+    P|x> = phase(x)|x xor m>, where m flags the qubits with X or Y and the sign of phase(x) is the parity
+    of the bits of x on the qubits with Z or Y. Only the components start <= x < stop of the result are
+    computed, blocks of block_size components at a time, so that no array of length 2**n is allocated
+    besides the result.
+
+    Args:
+        wavefunctions (np.ndarray): array of shape (N, 2**n).
+        H (QubitHamiltonian): operator.
+        qubits (list): qubits of the wavefunctions, the first one being the most significant.
+        start (int, optional): first component of the result. Defaults to 0.
+        stop (int, optional): end of the components of the result. Defaults to 2**n.
+        block_size (int, optional): number of components computed at a time. Defaults to 2**16.
+
+    Returns:
+        np.ndarray: array of shape (N, stop - start) with the components of the wavefunctions H|psi_i>.
+    """
+    n = len(qubits)
+    position = {q: k for k, q in enumerate(qubits)}
+    if stop is None:
+        stop = 2**n
+
+    strings = []
+    for ps in H.paulistrings:
+        x_mask, z_mask, factor = 0, 0, ps.coeff
+        for q, p in ps.items():
+            bit = 1 << (n - 1 - position[q])
+            if p.upper() in ["X", "Y"]:
+                x_mask |= bit
+            if p.upper() in ["Z", "Y"]:
+                z_mask |= bit
+            if p.upper() == "Y":
+                factor *= 1j
+        strings.append((x_mask, z_mask, factor))
+
+    result = np.zeros([wavefunctions.shape[0], stop - start], dtype=wavefunctions.dtype)
+    for begin in range(start, stop, block_size):
+        end = min(begin + block_size, stop)
+        index = np.arange(begin, end, dtype=np.int64)
+        for x_mask, z_mask, factor in strings:
+            source = index ^ x_mask
+            phase = (factor*(1 - 2*_parity(source & z_mask))).astype(wavefunctions.dtype)
+            result[:, begin-start:end-start] += phase*wavefunctions[:, source]
+
+    return result
+
+
+def inner_products(A: np.ndarray, B: np.ndarray, block_size: int = 2**16) -> np.ndarray:
+    """Function that computes A B^dagger accumulating in complex128, also when
+    A and B are stored in single precision: the columns are converted in blocks,
+    so that only block_size columns at a time are held in double precision.
+
+    Args:
+        A (np.ndarray): array of shape (N, D).
+        B (np.ndarray): array of shape (M, D).
+        block_size (int, optional): number of columns converted at a time. Defaults to 2**16.
+
+    Returns:
+        np.ndarray: complex128 array of shape (N, M).
+    """
+    result = np.zeros([A.shape[0], B.shape[0]], dtype=np.complex128)
+    for start in range(0, A.shape[1], block_size):
+        a = A[:, start:start+block_size].astype(np.complex128)
+        b = B[:, start:start+block_size].astype(np.complex128)
+        result += a @ b.conj().T
+    return result
+
+
+def batched_krylov_matrices(krylov_circs: list, H: QubitHamiltonian, variables: dict = None,
+                            precision: str = "double", n_check: int = 4, tolerance: float = 1.e-4,
+                            block_size: int = 2**16, info: dict = None) -> tuple:
+    """Function that computes the Krylov matrices from the wavefunctions of the Krylov states:
+    with the states as rows of Psi, S = Psi Psi^dagger and H = Psi (H Psi)^dagger,
+    i.e. S_ij = <psi_j|psi_i> and H_ij = <psi_j|H|psi_i> as in `krylov_method`.
+
+    The wavefunctions are simulated in place and H Psi is computed block_size columns at a time,
+    so that the memory is dominated by the (N, 2**n) array of the wavefunctions.
+    With precision "single" the wavefunctions are simulated and stored as complex64,
+    halving the memory, while the inner products are accumulated in complex128.
+    The spectrum of S on the first n_check states (at most half of the states, with a minimum of two)
+    is then compared with the one obtained in double precision: if the deviation, amplified by the condition number of S,
+    exceeds the tolerance a warning is raised and the matrices are recomputed in double precision.
+
+    Args:
+        krylov_circs (list): List of Krylov circuits.
+        H (QubitHamiltonian): Hamiltonian on which we want to apply Krylov method
+        variables (dict, optional): Dictionary with the values of the variables of the circuits. Defaults to None.
+        precision (str, optional): "double" (complex128) or "single" (complex64). Defaults to "double".
+        n_check (int, optional): number of states used for the accuracy check of single precision. Defaults to 4.
+        tolerance (float, optional): maximum accepted deviation of the spectrum of S times its condition number.
+                                     Defaults to 1.e-4.
+        block_size (int, optional): number of columns of H Psi computed at a time. Defaults to 2**16.
+        info (dict, optional): If given, it is filled with the precision used and, for single precision,
+                               with the "spectrum_error" and the "condition_number" of S. Defaults to None.
+
+    Returns:
+        tuple(np.ndarray, np.ndarray): H and S matrices.
+    """
+    qubits = sorted(set(q for U in krylov_circs for q in U.qubits) | set(H.qubits))
+    dtype = {"double": np.complex128, "single": np.complex64}[precision]
+
+    psi = simulate_batch(krylov_circs, qubits=qubits, variables=variables, dtype=dtype)
+    # H Psi is never stored: its columns are computed and contracted one block at a time
+    h = np.zeros([len(krylov_circs), len(krylov_circs)], dtype=np.complex128)
+    for start in range(0, psi.shape[1], block_size):
+        stop = min(start + block_size, psi.shape[1])
+        h += inner_products(psi[:, start:stop], apply_hamiltonian(psi, H, qubits, start, stop))
+    s = inner_products(psi, psi)
+    del psi
+
+    if precision == "single":
+        # the double precision states are simulated after the single precision ones are released,
+        # at most half of them so that the check never needs more memory than the batch itself
+        n_check = min(n_check, len(krylov_circs), max(2, len(krylov_circs)//2))
+        psi_check = simulate_batch(krylov_circs[:n_check], qubits=qubits, variables=variables)
+        s_check = inner_products(psi_check, psi_check)
+        spectrum_error = np.max(np.abs(np.linalg.eigvalsh(s[:n_check, :n_check]) - np.linalg.eigvalsh(s_check)))
+        spectrum_error = max(spectrum_error, np.finfo(np.float32).eps)
+        eigenvalues = np.linalg.eigvalsh(s)
+        condition_number = eigenvalues[-1]/max(eigenvalues[0], np.finfo(np.float64).tiny)
+        if info is not None:
+            info["spectrum_error"] = spectrum_error
+            info["condition_number"] = condition_number
+        if spectrum_error*condition_number > tolerance:
+            warnings.warn("single precision is not accurate enough for the Krylov matrices (condition number {:.2e}, "
+                          "spectrum error {:.2e}), falling back to double precision".format(condition_number,
+                                                                                              spectrum_error),
+                          TequilaWarning)
+            return batched_krylov_matrices(krylov_circs, H, variables=variables, precision="double",
+                                           block_size=block_size, info=info)
+
+    if info is not None:
+        info["precision"] = precision
+
+    return h, s
@@ -1,12 +1,21 @@
+import tequila as tq
+from tequila import TequilaException
 from tequila.circuit.circuit import QCircuit, find_unused_qubit
 from tequila.circuit.gates import H, X, Y, PauliGate
 from tequila.hamiltonian.qubit_hamiltonian import QubitHamiltonian
-from tequila.objective.objective import ExpectationValue
+from tequila.objective.objective import ExpectationValue, Objective
 from tequila.hamiltonian import paulis
 
 import numpy as np
 
-def braket(ket: QCircuit, bra: QCircuit = None, operator: QubitHamiltonian = None) -> ExpectationValue:
+from compression import compress_hamiltonian
+from symmetry import symmetry_sector, screen_operator, same_sector
+from stabilizer import is_clifford, stabilizer_braket
+from mps import mps_braket
+
+def braket(ket: QCircuit, bra: QCircuit = None, operator: QubitHamiltonian = None,
+           threshold: float = None, symmetries: list = None, stabilizer: bool = False, mps: bool = False,
+           max_bond_dimension: int = 64, info: dict = None, magnitude_only: bool = False) -> ExpectationValue:
     """Functions that allows to calculate different quantities 
        depending on the passed parameters:
        1) If only ket is passed, returns the overlap with itself (1).
@@ -21,6 +30,28 @@ def braket(ket: QCircuit, bra: QCircuit = None, operator: QubitHamiltonian = Non
         operator (QubitHamiltonian, optional): Operator of which we want to 
                                                calculate the transition element. 
                                                Defaults to None.
+        threshold (float, optional): If given, identical Pauli strings of the operator are merged
+                                     and the ones with coefficients smaller than threshold are dropped
+                                     (see `compress_hamiltonian`), the bound on the induced error
+                                     is written in info. Defaults to None.
+        symmetries (list, optional): Pauli strings of symmetries of the states. Pauli strings of the operator
+                                     connecting different symmetry sectors of ket and bra are skipped and
+                                     the overlap of states in different sectors is zero. Defaults to None.
+        stabilizer (bool, optional): If set to True and both circuits are Clifford circuits, the quantities
+                                     are computed in polynomial time with the stabilizer formalism
+                                     (see `stabilizer_braket`) and returned as numbers instead of objectives.
+                                     Defaults to False.
+        mps (bool, optional): If set to True the two states are contracted as matrix product states
+                              (see `mps_braket`) and the quantities are returned as numbers instead of objectives.
+                              Defaults to False.
+        max_bond_dimension (int, optional): maximum bond dimension of the matrix product states. Defaults to 64.
+        info (dict, optional): If given, it is filled with details of the computation: "error_bound" is the
+                               bound on the error induced by the threshold and, with mps, "truncation_error"
+                               is the weight discarded in the simulation of the states. Defaults to None.
+        magnitude_only (bool, optional): If set to True, returns the squared magnitude of the overlap |<ket|bra>|^2
+                                         as a single objective, the probability of all zeros after bra and the inverse
+                                         of ket without ancilla and controlled gates (see `make_overlap_magnitude`).
+                                         Can not be used with an operator. Defaults to False.
 
     Returns:
         ExpectationValue: 1, overlap, expectation value or transition element 
@@ -30,13 +61,53 @@ def braket(ket: QCircuit, bra: QCircuit = None, operator: QubitHamiltonian = Non
     if bra is None:
         bra = ket
 
+    if operator is not None and threshold is not None:
+        operator, error_bound = compress_hamiltonian(operator, threshold=threshold)
+        if info is not None:
+            info["error_bound"] = error_bound
+
+    zero_overlap = False
+    if symmetries is not None:
+        sector_ket = tuple(symmetry_sector(ket, symmetry) for symmetry in symmetries)
+        sector_bra = tuple(symmetry_sector(bra, symmetry) for symmetry in symmetries)
+        if operator is not None:
+            operator = screen_operator(operator, sector_ket, sector_bra, symmetries)
+        else:
+            zero_overlap = not same_sector(sector_ket, sector_bra)
+
+    if magnitude_only:
+        if operator is not None:
+            raise TequilaException("braket: magnitude_only is available only for overlaps, not with an operator")
+        if id(ket) == id(bra):
+            return 1.0
+        if zero_overlap:
+            return Objective()
+        return make_overlap_magnitude(U0=ket, U1=bra)
+
+    if stabilizer and is_clifford(ket) and is_clifford(bra):
+        if zero_overlap:
+            return 0.0, 0.0
+        return stabilizer_braket(ket=ket, bra=bra, operator=operator)
+
+    if mps:
+        if zero_overlap:
+            return 0.0, 0.0
+        return mps_braket(ket=ket, bra=bra, operator=operator, max_bond_dimension=max_bond_dimension, info=info)
+
+    if zero_overlap:
+        return Objective(), Objective()
+
     if id(ket) == id(bra):
         if operator is None:
             return 1.0
+        if len(operator.paulistrings) == 0:
+            return Objective()
         return ExpectationValue(H=operator, U=ket)
     else:
         if operator is None:
             return make_overlap(U0 = ket, U1 = bra)
+        if len(operator.paulistrings) == 0:
+            return Objective(), Objective()
         
         return make_transition(U0 = ket, U1 = bra, H = operator)
 
@@ -77,6 +148,33 @@ def make_overlap(U0:QCircuit = None, U1:QCircuit = None) -> ExpectationValue:
     return Ex, Ey
 
 
+def make_overlap_magnitude(U0:QCircuit = None, U1:QCircuit = None) -> Objective:
+    '''
+    Function that calculates the squared magnitude of the overlap between two quantum states,
+    |<U0|U1>|^2, as the probability of measuring all the qubits in 0 after U1 and the inverse of U0.
+    No ancilla and no controlled gates are needed, but the phase of the overlap is lost.
+    The probability is the squared amplitude <0...0|U0^dagger U1|0...0>, a tequila BraKet of the circuit
+    against the empty circuit, so no projector with 2^n Pauli strings is built: simulators read the
+    amplitude from the wavefunction, while with samples tequila estimates it with a Hadamard test.
+
+    Parameters
+    ----------
+    U0 : QCircuit tequila object, corresponding to the first state.
+
+    U1 : QCircuit tequila object, corresponding to the second state.
+
+    Returns
+    -------
+    Tequila objective to be simulated or compiled.
+
+    '''
+
+    circuit = U1 + U0.dagger()
+    amplitude = tq.BraKet(ket=circuit, bra=QCircuit())
+
+    return amplitude.apply(lambda z: abs(z)**2)
+
+
 def make_transition(U0:QCircuit = None, U1:QCircuit = None, H: QubitHamiltonian = None) -> ExpectationValue:
     '''
     Function that calculates the transition elements of an Hamiltonian operator
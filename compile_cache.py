@@ -0,0 +1,200 @@
+import copy
+import collections
+import numbers
+import numpy as np
+import tequila as tq
+from tequila.circuit.circuit import QCircuit
+from tequila.hamiltonian import PauliString
+from tequila.hamiltonian.qubit_hamiltonian import QubitHamiltonian
+from tequila.objective.objective import Variable
+
+from braket import braket
+
+
+def abstract_circuit(U: QCircuit, variables: dict = None, prefix: str = "theta") -> tuple:
+    """Function that replaces the parameter of every parametrized gate of a circuit
+    with a new variable (prefix, k), where k is the position of the gate in the circuit.
+    Circuits that differ only in their angles are mapped to the same template circuit.
+
+    Args:
+        U (QCircuit): circuit to be abstracted.
+        variables (dict, optional): Dictionary with the values of the variables of the circuit. Defaults to None.
+        prefix (str, optional): name of the new variables. Defaults to "theta".
+
+    Returns:
+        tuple(QCircuit, dict): template circuit, dictionary with the values of the new variables.
+    """
+    gates = []
+    values = {}
+    for k, gate in enumerate(U.gates):
+        if gate.is_parameterized():
+            name = Variable((prefix, k))
+            values[name] = float(gate.parameter(variables))
+            gate = copy.deepcopy(gate)
+            gate.parameter = name
+        gates.append(gate)
+
+    return QCircuit.wrap_gate(gates), values
+
+
+def _hamiltonian_key(H: QubitHamiltonian) -> tuple:
+    """Hashable and exact representation of an operator (None for no operator)."""
+    if H is None:
+        return None
+    return tuple((tuple(sorted(ps.items())), ps.coeff) for ps in H.paulistrings)
+
+
+def _attribute_key(value):
+    """Hashable and exact representation of a gate attribute. Objects that can not be represented
+    exactly are used as they are (or replaced by a new object if unhashable), so that gates holding them
+    are never considered equal to other gates."""
+    if value is None or isinstance(value, (str, numbers.Number)):
+        return value
+    if isinstance(value, QubitHamiltonian):
+        return _hamiltonian_key(value)
+    if isinstance(value, PauliString):
+        return tuple(sorted(value.items())), value.coeff
+    if isinstance(value, (tuple, list)):
+        return tuple(_attribute_key(item) for item in value)
+    if isinstance(value, np.ndarray):
+        return value.shape, value.dtype.str, value.tobytes()
+    try:
+        hash(value)
+    except TypeError:
+        return object()
+    return value
+
+
+def gate_key(gate) -> tuple:
+    """Function that returns a hashable key describing a gate without its angle: its type together with
+    all the other attributes of the gate (name, targets, controls, generator, Trotter steps,
+    eigenvalues magnitude, ...).
+
+    Args:
+        gate: gate of a circuit.
+
+    Returns:
+        tuple: key of the gate.
+    """
+    return (type(gate).__name__,) + tuple((name, _attribute_key(value)) for name, value in sorted(vars(gate).items())
+                                          if name != "_parameter")
+
+
+def structural_key(U: QCircuit) -> tuple:
+    """Function that returns a hashable key describing the structure of a circuit,
+    that is its gates with all their attributes (see `gate_key`) but without their angles.
+
+    Args:
+        U (QCircuit): circuit.
+
+    Returns:
+        tuple: structural key of the circuit.
+    """
+    return tuple(gate_key(gate) for gate in U.gates)
+
+
+class CompiledObjectiveCache:
+    """Size-bounded least recently used cache of compiled objectives.
+
+    Args:
+        maxsize (int, optional): Maximum number of entries kept in the cache. Defaults to 256.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, builder):
+        """Returns the entry stored for the key, calling builder() to create it if it is missing.
+        The least recently used entry is removed once the cache is full.
+
+        Args:
+            key: hashable key of the entry.
+            builder (callable): function without arguments creating the entry.
+
+        Returns:
+            the entry stored for the key.
+        """
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        entry = builder()
+        self._entries[key] = entry
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self.hits = 0
+        self.misses = 0
+        self._entries.clear()
+
+
+default_cache = CompiledObjectiveCache()
+
+
+def cached_braket(ket: QCircuit, bra: QCircuit = None, operator: QubitHamiltonian = None, variables: dict = None,
+                  cache: CompiledObjectiveCache = None, compile_args: tuple = (), **kwargs):
+    """Function that evaluates `braket` using compiled objectives stored in a cache.
+    The circuits are abstracted with `abstract_circuit` and the objectives are compiled
+    only the first time a given structure (circuits, operator and compile options) is met,
+    later calls only update the values of the angles.
+    The positional compile_args and the optional keyword arguments (**kwargs) are passed to `tq.compile`.
+
+    Args:
+        ket (QCircuit): QCircuit corresponding to a state.
+        bra (QCircuit, optional): QCircuit corresponding to a second state. Defaults to None.
+        operator (QubitHamiltonian, optional): Operator of which we want to
+                                               calculate the transition element. Defaults to None.
+        variables (dict, optional): Dictionary with the values of the variables of the circuits. Defaults to None.
+        cache (CompiledObjectiveCache, optional): cache to be used. Defaults to the process-wide `default_cache`.
+        compile_args (tuple, optional): positional arguments of `tq.compile` after the objective. Defaults to ().
+
+    Returns:
+        1, expectation value or tuple with real and imaginary part of the
+        overlap or of the transition element depending on the inputs.
+    """
+    if cache is None:
+        cache = default_cache
+
+    if bra is None:
+        bra = ket
+
+    ket_x, values = abstract_circuit(ket, variables=variables, prefix="ket")
+    if id(ket) == id(bra):
+        bra_x = ket_x
+        bra_key = None
+    else:
+        bra_x, bra_values = abstract_circuit(bra, variables=variables, prefix="bra")
+        values.update(bra_values)
+        bra_key = structural_key(bra_x)
+
+    key = (structural_key(ket_x), bra_key, _hamiltonian_key(operator), str(compile_args),
+           str(sorted(kwargs.items())))
+
+    def builder():
+        objectives = braket(ket=ket_x, bra=bra_x, operator=operator)
+        if isinstance(objectives, tuple):
+            return tuple(tq.compile(objective, *compile_args, **kwargs) for objective in objectives)
+        if isinstance(objectives, numbers.Number):
+            return objectives
+        return tq.compile(objectives, *compile_args, **kwargs)
+
+    compiled = cache.get(key, builder)
+
+    if isinstance(compiled, tuple):
+        return tuple(objective(variables=values) for objective in compiled)
+    if isinstance(compiled, numbers.Number):
+        return compiled
+    return compiled(variables=values)
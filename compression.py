@@ -0,0 +1,47 @@
+import numpy as np
+from tequila.hamiltonian import PauliString
+from tequila.hamiltonian.qubit_hamiltonian import QubitHamiltonian
+
+
+def compress_hamiltonian(H: QubitHamiltonian, threshold: float = 0.0, sample: bool = False,
+                         seed: int = None) -> tuple:
+    """Function that reduces the number of Pauli strings of an Hamiltonian before
+    the evaluation of transition elements, where every Pauli string costs one circuit.
+    Identical Pauli strings are merged and the strings with |c_k| < threshold are
+    either dropped or, if sample is True, kept with probability |c_k|/threshold and
+    coefficient threshold*c_k/|c_k| (so that the compressed Hamiltonian is unbiased).
+
+    Since |<U_i|P_k|U_j>| <= 1 for normalized states, the error induced on every
+    transition element H_ij is bounded by the returned error bound:
+    the sum of |c_k| over the dropped strings plus the sum of threshold - |c_k|
+    over the sampled strings that have been kept.
+
+    Args:
+        H (QubitHamiltonian): Hamiltonian to be compressed.
+        threshold (float, optional): Strings with coefficients smaller (in absolute value) than threshold
+                                     are dropped or sampled. Defaults to 0.
+        sample (bool, optional): If set to True the small strings are sampled instead of dropped.
+                                 Defaults to False.
+        seed (int, optional): Seed for the sampling of the small strings. Defaults to None.
+
+    Returns:
+        tuple(QubitHamiltonian, float): compressed Hamiltonian, bound on the error of every transition element.
+    """
+    merged = {}
+    for ps in H.paulistrings:
+        key = ps.key_openfermion()
+        merged[key] = merged.get(key, 0.0) + ps.coeff
+
+    rng = np.random.default_rng(seed)
+    paulistrings = []
+    error_bound = 0.0
+    for key, coeff in merged.items():
+        if abs(coeff) >= threshold and coeff != 0:
+            paulistrings.append(PauliString(data=dict(key), coeff=coeff))
+        elif sample and coeff != 0 and rng.random() < abs(coeff)/threshold:
+            paulistrings.append(PauliString(data=dict(key), coeff=threshold*coeff/abs(coeff)))
+            error_bound += threshold - abs(coeff)
+        else:
+            error_bound += abs(coeff)
+
+    return QubitHamiltonian.from_paulistrings(paulistrings), error_bound
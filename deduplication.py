@@ -0,0 +1,112 @@
+import numpy as np
+import tequila as tq
+from tequila import TequilaException
+from tequila.circuit.circuit import QCircuit
+from tequila.hamiltonian import PauliString
+from tequila.hamiltonian.qubit_hamiltonian import QubitHamiltonian
+from tequila.objective.objective import ExpectationValueImpl
+
+from compile_cache import structural_key
+
+
+# positional arguments of `tq.simulate` after the objective
+SIMULATE_ARGUMENTS = ["variables", "samples", "backend", "noise", "device"]
+
+
+def simulate_options(args: tuple, kwargs: dict) -> dict:
+    """Function that collects the options of `tq.simulate`, given positionally (args) or by name (kwargs),
+    in a single dictionary.
+
+    Args:
+        args (tuple): positional arguments of `tq.simulate` after the objective.
+        kwargs (dict): keyword arguments of `tq.simulate`.
+
+    Returns:
+        dict: options by name.
+    """
+    return {**dict(zip(SIMULATE_ARGUMENTS, args)), **kwargs}
+
+
+def circuit_key(U: QCircuit) -> tuple:
+    """Function that returns a hashable key identifying a circuit with numerical angles:
+    its structure (see `structural_key`, all the attributes of the gates but the angles)
+    together with the angles of the parametrized gates.
+
+    Args:
+        U (QCircuit): circuit without free variables.
+
+    Returns:
+        tuple: key of the circuit.
+    """
+    angles = tuple(float(gate.parameter()) for gate in U.gates if gate.is_parameterized())
+    return structural_key(U), angles
+
+
+def _restrict(H: QubitHamiltonian, qubits: set) -> QubitHamiltonian:
+    """Restricts an operator to the qubits of a circuit, the other qubits being in |0>:
+    there Z gives 1 and Pauli strings with X or Y vanish."""
+    paulistrings = []
+    for ps in H.paulistrings:
+        if any(q not in qubits and p.upper() != "Z" for q, p in ps.items()):
+            continue
+        paulistrings.append(PauliString(data={q: p for q, p in ps.items() if q in qubits}, coeff=ps.coeff))
+    return QubitHamiltonian.from_paulistrings(paulistrings)
+
+
+def simulate_deduplicated(tensors: list, *args, info: dict = None, **kwargs) -> list:
+    """Function that evaluates objectives (or QTensors of objectives) simulating every distinct circuit only once.
+    The expectation values of all the objectives are grouped by circuit (see `circuit_key`), the wavefunction of
+    each circuit is simulated with `tq.simulate` and all the observables measured on that circuit are evaluated
+    from it. For example the X and Y objectives of the same Hadamard test, or the identity Pauli string of H and
+    the corresponding overlap, share their simulation.
+    Optional arguments (*args, **kwargs) are passed to `tq.simulate`; since wavefunctions are needed,
+    sampling and noise are not supported and raise a TequilaException.
+
+    Args:
+        tensors (list): list of objectives or QTensors of objectives, without free variables.
+        info (dict, optional): If given, "expectation_values" is set to the number of expectation values
+                               (the circuits that would be simulated one by one) and "simulated_circuits"
+                               to the number of distinct circuits actually simulated. Defaults to None.
+
+    Returns:
+        list: values of the objectives, numpy arrays for QTensors.
+    """
+    options = simulate_options(args, kwargs)
+    if options.get("samples") is not None or options.get("noise") is not None:
+        raise TequilaException("simulate_deduplicated: wavefunctions are needed, samples and noise are not supported")
+
+    arrays = [np.asarray(tensor, dtype=object) for tensor in tensors]
+
+    expectation_values = {}
+    for array in arrays:
+        for objective in array.flat:
+            for arg in objective.args:
+                if isinstance(arg, ExpectationValueImpl):
+                    expectation_values[id(arg)] = arg
+
+    groups = {}
+    for E in expectation_values.values():
+        groups.setdefault(circuit_key(E.U), []).append(E)
+
+    values = {}
+    for group in groups.values():
+        wavefunction = tq.simulate(group[0].U, *args, **kwargs)
+        qubits = set(group[0].U.qubits)
+        for E in group:
+            value = []
+            for H in E.H:
+                H = _restrict(H, qubits)
+                value.append(wavefunction.compute_expectationvalue(H) if len(H.paulistrings) else 0.0)
+            values[id(E)] = value[0] if len(value) == 1 else np.array(value)
+
+    if info is not None:
+        info["expectation_values"] = len(expectation_values)
+        info["simulated_circuits"] = len(groups)
+
+    results = []
+    for tensor, array in zip(tensors, arrays):
+        result = np.array([objective.transformation(*[values[id(arg)] for arg in objective.args])
+                           for objective in array.flat]).reshape(array.shape)
+        results.append(result if array.ndim else result[()])
+
+    return results
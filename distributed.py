@@ -0,0 +1,299 @@
+import os
+import argparse
+import threading
+import collections
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+import numpy as np
+import tequila as tq
+from tequila import TequilaException
+from tequila.hamiltonian.qubit_hamiltonian import QubitHamiltonian
+from tequila.objective.objective import ExpectationValue
+
+from braket import braket
+
+# Messages are exchanged with multiprocessing connections: every connection is authenticated with an HMAC
+# challenge on the shared authkey before any message is unpickled.
+AUTHKEY_VARIABLE = "KRYLOV_WORKER_AUTHKEY"
+
+
+def evaluate_task(krylov_circs: list, i: int, j: int, operator: QubitHamiltonian = None, *args, **kwargs) -> complex:
+    """Function that evaluates one contribution to the Krylov matrices, <U_j|operator|U_i>
+    (or the overlap <U_j|U_i> if no operator is given), simulating the objectives of `braket`.
+    Optional arguments (*args, **kwargs) are passed to `tq.simulate`.
+
+    Args:
+        krylov_circs (list): List of Krylov circuits.
+        i (int): index of the first state.
+        j (int): index of the second state.
+        operator (QubitHamiltonian, optional): block of Pauli strings of the Hamiltonian. Defaults to None.
+
+    Returns:
+        complex: value of the contribution.
+    """
+    if i == j:
+        if operator is None:
+            return 1.0
+        return tq.simulate(ExpectationValue(H=operator, U=krylov_circs[i]), *args, **kwargs)
+    real, im = braket(bra=krylov_circs[i], ket=krylov_circs[j], operator=operator)
+    return tq.simulate(real, *args, **kwargs) + 1.0j*tq.simulate(im, *args, **kwargs)
+
+
+def _serve_coordinator(connection: Connection):
+    """Serves one coordinator: a "setup" message with the circuits and the simulation options,
+    followed by "task" messages, each one answered with its value or with the raised error."""
+    krylov_circs, args, kwargs = [], (), {}
+    with connection:
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                return
+            if message["type"] == "setup":
+                krylov_circs, args, kwargs = message["circuits"], message["args"], message["kwargs"]
+                continue
+            try:
+                value = evaluate_task(krylov_circs, message["i"], message["j"], message["operator"], *args, **kwargs)
+                reply = {"id": message["id"], "value": complex(value)}
+            except Exception as error:
+                reply = {"id": message["id"], "error": repr(error)}
+            try:
+                connection.send(reply)
+            except OSError:
+                return
+
+
+class KrylovWorker:
+    """Worker process evaluating Krylov matrix elements sent by `distributed_krylov_matrices`.
+    Only coordinators knowing the authkey are accepted, every one of them is served in its own thread.
+
+    Args:
+        host (str, optional): address to listen on. Defaults to "localhost".
+        port (int, optional): port to listen on, 0 picks a free one. Defaults to 0.
+        authkey (bytes): secret shared with the coordinators.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 0, authkey: bytes = None):
+        if not authkey:
+            raise TequilaException("KrylovWorker: an authkey is needed to authenticate the coordinators")
+        self.authkey = authkey
+        self.listener = Listener((host, port), authkey=authkey)
+        self.address = self.listener.address
+        self._closed = False
+
+    def serve_forever(self):
+        while not self._closed:
+            try:
+                connection = self.listener.accept()
+            except (AuthenticationError, EOFError, ConnectionError):
+                continue
+            except OSError:
+                return
+            if self._closed:
+                connection.close()
+                return
+            threading.Thread(target=_serve_coordinator, args=(connection,), daemon=True).start()
+
+    def start(self) -> threading.Thread:
+        """Serves in a background thread."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        self._closed = True
+        try:
+            # wakes up the accepting thread
+            Client(self.address, authkey=self.authkey).close()
+        except OSError:
+            pass
+        self.listener.close()
+
+
+class _TaskPool:
+    """Tasks split among the workers, one deque each. A worker takes tasks from the front of its
+    own deque and, when this is empty, steals from the back of the longest deque of the others.
+    Tasks of failed workers are handed over to the remaining ones."""
+
+    def __init__(self, tasks: list, n_workers: int):
+        self.deques = [collections.deque(tasks[k::n_workers]) for k in range(n_workers)]
+        self.alive = [True]*n_workers
+        self.pending = len(tasks)
+        self.stolen = 0
+        self.redispatched = 0
+        self.error = None
+        self.condition = threading.Condition()
+
+    def take(self, k: int):
+        with self.condition:
+            while True:
+                if self.error is not None or self.pending == 0:
+                    return None
+                if self.deques[k]:
+                    return self.deques[k].popleft()
+                victim = max(range(len(self.deques)), key=lambda w: len(self.deques[w]))
+                if self.deques[victim]:
+                    self.stolen += 1
+                    return self.deques[victim].pop()
+                self.condition.wait()
+
+    def done(self):
+        with self.condition:
+            self.pending -= 1
+            self.condition.notify_all()
+
+    def requeue(self, task):
+        with self.condition:
+            self.redispatched += 1
+            alive = [k for k in range(len(self.deques)) if self.alive[k]]
+            if alive:
+                self.deques[min(alive, key=lambda k: len(self.deques[k]))].append(task)
+            self.condition.notify_all()
+
+    def fail_worker(self, k: int, task=None):
+        with self.condition:
+            self.alive[k] = False
+            alive = [w for w in range(len(self.deques)) if self.alive[w]]
+            if not alive:
+                self.error = TequilaException("distributed_krylov_matrices: all the workers failed")
+            else:
+                orphans = list(self.deques[k]) + ([task] if task is not None else [])
+                self.deques[k].clear()
+                for n, orphan in enumerate(orphans):
+                    self.deques[alive[n % len(alive)]].append(orphan)
+                self.redispatched += len(orphans)
+            self.condition.notify_all()
+
+    def abort(self, error: Exception):
+        with self.condition:
+            self.error = error
+            self.condition.notify_all()
+
+
+def _serve_tasks(address: tuple, k: int, pool: _TaskPool, setup: dict, results: dict, counts: list,
+                 authkey: bytes, timeout: float, max_retries: int):
+    """Sends tasks to one worker until the pool is empty or the worker fails."""
+    try:
+        connection = Client(address, authkey=authkey)
+        connection.send(setup)
+    except (OSError, EOFError, AuthenticationError):
+        pool.fail_worker(k)
+        return
+
+    with connection:
+        while True:
+            task = pool.take(k)
+            if task is None:
+                return
+            try:
+                connection.send(task)
+                reply = connection.recv() if timeout is None or connection.poll(timeout) else None
+            except (OSError, EOFError):
+                reply = None
+            if reply is None:
+                pool.fail_worker(k, task)
+                return
+            if "error" in reply:
+                task["attempts"] = task.get("attempts", 0) + 1
+                if task["attempts"] > max_retries:
+                    pool.abort(TequilaException("distributed_krylov_matrices: task ({}, {}) failed on {}: {}".format(
+                        task["i"], task["j"], address, reply["error"])))
+                    return
+                pool.requeue(task)
+                continue
+            results[task["id"]] = reply["value"]
+            counts[k] += 1
+            pool.done()
+
+
+def distributed_krylov_matrices(krylov_circs: list, operators: dict, overlaps: dict, workers: list,
+                                variables: dict = None, *args, authkey: bytes = None, block_size: int = 16,
+                                timeout: float = None, max_retries: int = 3, info: dict = None, **kwargs) -> tuple:
+    """Function that computes the Krylov matrices on remote `KrylovWorker`s, with the same convention
+    of `krylov_method`: S_ij = <U_j|U_i> and H_ij = <U_j|H|U_i>.
+    The circuits are sent once to every worker, then every element is split into tasks (i, j, term block),
+    each one carrying a block of at most block_size Pauli strings of the Hamiltonian.
+    Tasks are distributed among the workers and idle workers steal tasks from the busiest ones;
+    the tasks of workers that disconnect (or do not answer within timeout) are re-dispatched to the others,
+    tasks raising an error are retried up to max_retries times.
+    Connections are authenticated with the authkey shared with the workers.
+    Optional arguments (*args, **kwargs) are passed to `tq.simulate` on the workers.
+
+    Args:
+        krylov_circs (list): List of Krylov circuits.
+        operators (dict): operator of each element (i, j) with i <= j.
+        overlaps (dict): whether the overlap of each couple (i, j) with i < j can be non-zero.
+        workers (list): list of (host, port) addresses of the workers.
+        variables (dict, optional): Dictionary with the values of the variables of the circuits. Defaults to None.
+        authkey (bytes, optional): secret shared with the workers. Defaults to the value of the environment
+                                   variable KRYLOV_WORKER_AUTHKEY.
+        block_size (int, optional): maximum number of Pauli strings of a task. Defaults to 16.
+        timeout (float, optional): seconds after which a silent worker is considered failed. Defaults to None.
+        max_retries (int, optional): Number of times a task raising an error is resubmitted. Defaults to 3.
+        info (dict, optional): If given, it is filled with the number of "tasks", the number of "stolen" and
+                               "redispatched" tasks and the "tasks_per_worker". Defaults to None.
+
+    Returns:
+        tuple(np.ndarray, np.ndarray): H and S matrices.
+    """
+    if authkey is None:
+        authkey = os.environ.get(AUTHKEY_VARIABLE, "").encode()
+    if not authkey:
+        raise TequilaException("distributed_krylov_matrices: an authkey is needed to authenticate to the workers")
+
+    if variables is not None:
+        krylov_circs = [U.map_variables(variables) for U in krylov_circs]
+
+    n_krylov_states = len(krylov_circs)
+    tasks = []
+    for (i, j), operator in operators.items():
+        paulistrings = operator.paulistrings
+        for start in range(0, len(paulistrings), block_size):
+            block = QubitHamiltonian.from_paulistrings(paulistrings[start:start+block_size])
+            tasks.append({"type": "task", "id": len(tasks), "i": i, "j": j, "operator": block})
+        if i != j and overlaps[i, j]:
+            tasks.append({"type": "task", "id": len(tasks), "i": i, "j": j, "operator": None})
+
+    setup = {"type": "setup", "circuits": list(krylov_circs), "args": args, "kwargs": kwargs}
+    workers = [tuple(address) for address in workers]
+    pool = _TaskPool(tasks, len(workers))
+    results = {}
+    counts = [0]*len(workers)
+    threads = [threading.Thread(target=_serve_tasks,
+                                args=(address, k, pool, setup, results, counts, authkey, timeout, max_retries))
+               for k, address in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if pool.error is not None:
+        raise pool.error
+
+    h = np.zeros([n_krylov_states, n_krylov_states], dtype=complex)
+    s = np.eye(n_krylov_states, dtype=complex)
+    for task in tasks:
+        i, j = task["i"], task["j"]
+        matrix = h if task["operator"] is not None else s
+        matrix[i, j] += results[task["id"]]
+    for i in range(n_krylov_states):
+        h[i, i] = np.real(h[i, i])
+        for j in range(i + 1, n_krylov_states):
+            h[j, i] = np.conj(h[i, j])
+            s[j, i] = np.conj(s[i, j])
+
+    if info is not None:
+        info["tasks"] = len(tasks)
+        info["stolen"] = pool.stolen
+        info["redispatched"] = pool.redispatched
+        info["tasks_per_worker"] = dict(zip(workers, counts))
+
+    return h, s
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker evaluating Krylov matrix elements. The authkey shared "
+                                                 "with the coordinators is read from " + AUTHKEY_VARIABLE + ".")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5555)
+    options = parser.parse_args()
+    KrylovWorker(options.host, options.port, authkey=os.environ.get(AUTHKEY_VARIABLE, "").encode()).serve_forever()
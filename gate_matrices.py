@@ -0,0 +1,67 @@
+import scipy
+import numpy as np
+from tequila import TequilaException
+from tequila.circuit._gates_impl import GlobalPhaseGateImpl, TrotterizedGateImpl
+from tequila.hamiltonian.qubit_hamiltonian import QubitHamiltonian
+
+PAULI_MATRICES = {
+    "I": np.eye(2, dtype=complex),
+    "X": np.array([[0, 1], [1, 0]], dtype=complex),
+    "Y": np.array([[0, -1j], [1j, 0]], dtype=complex),
+    "Z": np.array([[1, 0], [0, -1]], dtype=complex),
+}
+
+
+def hamiltonian_matrix(H: QubitHamiltonian, qubits: tuple) -> np.ndarray:
+    """Function that returns the matrix of an operator acting on the given qubits,
+    with the first qubit being the most significant one (same ordering as tequila wavefunctions).
+
+    Args:
+        H (QubitHamiltonian): operator.
+        qubits (tuple): qubits on which the matrix is built, they have to include the qubits of H.
+
+    Returns:
+        np.ndarray: matrix of dimension 2**len(qubits).
+    """
+    matrix = np.zeros([2**len(qubits), 2**len(qubits)], dtype=complex)
+    for ps in H.paulistrings:
+        term = np.ones([1, 1], dtype=complex)
+        for q in qubits:
+            term = np.kron(term, PAULI_MATRICES[ps[q].upper() if q in ps.keys() else "I"])
+        matrix += ps.coeff*term
+
+    return matrix
+
+
+def gate_matrix(gate, variables: dict = None) -> tuple:
+    """Function that returns the unitary matrix of a tequila gate on its own qubits.
+    Tequila gates act as exp(-i angle/2 generator) on their targets, where non-parametrized
+    gates (X, H, SWAP, ...) have angle pi, and only if all the controls are in |1>.
+
+    Args:
+        gate: tequila gate (element of QCircuit.gates).
+        variables (dict, optional): Dictionary with the values of the variables of the gate. Defaults to None.
+
+    Returns:
+        tuple(tuple, np.ndarray): qubits (controls first, then targets, the first being the most significant)
+                                  and unitary matrix on those qubits.
+    """
+    if isinstance(gate, TrotterizedGateImpl):
+        raise TequilaException("gate_matrix: trotterized gates are not supported, compile them first")
+
+    if isinstance(gate, GlobalPhaseGateImpl):
+        return tuple(), np.array([[np.exp(1j*float(gate.parameter(variables)))]])
+
+    targets = tuple(gate.target)
+    controls = tuple(gate.control)
+
+    if gate.generator is None:
+        target_matrix = np.eye(2**len(targets), dtype=complex)
+    else:
+        angle = float(gate.parameter(variables)) if gate.is_parameterized() else np.pi
+        target_matrix = scipy.linalg.expm(-0.5j*angle*hamiltonian_matrix(gate.generator, targets))
+
+    matrix = np.eye(2**(len(controls) + len(targets)), dtype=complex)
+    matrix[-len(target_matrix):, -len(target_matrix):] = target_matrix
+
+    return controls + targets, matrix
@@ -1,11 +1,26 @@
 import copy
 import scipy
+import numpy as np
 import tequila as tq
-from tequila import braket
+from tequila import TequilaException
 from tequila.hamiltonian.qubit_hamiltonian import QubitHamiltonian
 
+from braket import braket
+from compile_cache import CompiledObjectiveCache, cached_braket, default_cache
+from compression import compress_hamiltonian
+from symmetry import detect_symmetries, same_sector, screen_operator, symmetry_sector
+from stabilizer import is_clifford, stabilizer_braket
+from batched_simulator import batched_krylov_matrices
+from mps import mps_krylov_matrices
+from distributed import distributed_krylov_matrices
+from deduplication import simulate_deduplicated, simulate_options
 
-def krylov_method(krylov_circs:list, H:QubitHamiltonian, variables:dict=None, assume_real:bool=False, *args, **kwargs)->tuple:
+
+def krylov_method(krylov_circs:list, H:QubitHamiltonian, variables:dict=None, assume_real:bool=False, *args,
+                  cache:CompiledObjectiveCache=None, threshold:float=None, sample:bool=False,
+                  symmetries:list=None, stabilizer:bool=None, batched:bool=False, precision:str="double",
+                  mps:bool=False, max_bond_dimension:int=64, workers:list=None, authkey:bytes=None,
+                  deduplicate:bool=None, info:dict=None, **kwargs)->tuple:
     """Function that applies Krylov method to an Hamiltonian operator,
     given the list of Krylov quantum circuits. If the circuits are parametrized 
     also the variables need to be passed. The method returns the ground state energy 
@@ -19,12 +34,98 @@ def krylov_method(krylov_circs:list, H:QubitHamiltonian, variables:dict=None, as
         Defaults to None.
         assume_real (bool): If set to True the function does not compute the imaginary part.
         Default to False.
+        cache (CompiledObjectiveCache, optional): If given (or set to True for the process-wide cache),
+        the objectives are compiled once per circuit structure and reused with new angles. Defaults to None.
+        threshold (float, optional): If given, the Hamiltonian is compressed with `compress_hamiltonian`
+        before building the circuits: identical Pauli strings are merged and the ones with coefficients
+        smaller than threshold are dropped (or sampled if sample is True). Defaults to None.
+        sample (bool): If set to True the small Pauli strings are sampled instead of dropped. Default to False.
+        symmetries (list, optional): Pauli strings of symmetries of the Krylov states, or "auto" to detect
+        them from the gates of the circuits (see `detect_symmetries`). The symmetry sector of each state is
+        determined from its circuit, and the Pauli strings and overlaps connecting different sectors,
+        which are zero, are skipped before building any circuit. Defaults to None.
+        stabilizer (bool, optional): If set to True the matrices are computed with the stabilizer formalism
+        (see `stabilizer_braket`), which requires Clifford circuits. By default it is used when all the
+        circuits are Clifford circuits, no cache is given and no samples or noise are given.
+        It can not be combined with cache. Defaults to None.
+        batched (bool): If set to True the wavefunctions of all the Krylov states are simulated together
+        with numpy (see `simulate_batch`) and the matrices are obtained as dense matrix products
+        S = Psi Psi^dagger and H = Psi (H Psi)^dagger. Default to False.
+        precision (str): "double" or "single". With "single" the batched wavefunctions are stored as complex64,
+        with inner products accumulated in complex128 and a fall back to double precision if S is too
+        ill-conditioned (see `batched_krylov_matrices`); it implies batched=True. Default to "double".
+        mps (bool): If set to True every Krylov state is simulated once as a matrix product state and the matrices
+        are obtained contracting them, with the Pauli strings applied as MPOs (see `mps_krylov_matrices`).
+        Default to False.
+        max_bond_dimension (int): maximum bond dimension of the matrix product states. Default to 64.
+        workers (list, optional): (host, port) addresses of `KrylovWorker`s. If given, the elements of the matrices
+        are split into (i, j, term block) tasks evaluated on the workers (see `distributed_krylov_matrices`).
+        Defaults to None.
+        authkey (bytes, optional): secret shared with the workers, by default it is read from the environment
+        variable KRYLOV_WORKER_AUTHKEY. Defaults to None.
+        deduplicate (bool, optional): If set to True the circuits of all the objectives of the matrices are
+        simulated only once each and all the observables are evaluated from the shared wavefunctions
+        (see `simulate_deduplicated`). By default it is used unless samples or noise are given,
+        positionally or by name.
+        Defaults to None.
+        info (dict, optional): If given, it is filled with details of the computation:
+        "error_bound" is the bound on the error of every element of H induced by the compression,
+        "screened_terms" and "screened_overlaps" are the numbers of Pauli terms of H and of elements
+        of S skipped by symmetry, "precision", "spectrum_error" and "condition_number" describe
+        the batched single precision evaluation, "truncation_error" and "bond_dimension" the matrix
+        product states, "tasks", "stolen", "redispatched" and "tasks_per_worker" the distributed
+        evaluation, "expectation_values" and "simulated_circuits" the reduction of the number of
+        simulations with deduplicate. Defaults to None.
 
     Returns:
         tuple(np.ndarray, np.ndarray): array of energies, array of krylov coefficients corresponding to the energies
     """
     
     n_krylov_states = len(krylov_circs)
+
+    if threshold is not None:
+        H, error_bound = compress_hamiltonian(H, threshold=threshold, sample=sample)
+        if info is not None:
+            info["error_bound"] = error_bound
+
+    if batched or precision != "double":
+        h, s = batched_krylov_matrices(krylov_circs, H, variables, precision=precision, info=info)
+        v,vv = scipy.linalg.eigh(h,s)
+        return v, vv
+
+    operators, overlaps = _screen(krylov_circs, H, variables, symmetries, info)
+
+    if mps:
+        h, s = mps_krylov_matrices(krylov_circs, operators, overlaps, variables, max_bond_dimension, info)
+        v,vv = scipy.linalg.eigh(h,s)
+        return v, vv
+
+    if workers is not None:
+        h, s = distributed_krylov_matrices(krylov_circs, operators, overlaps, workers, variables, *args,
+                                           authkey=authkey, info=info, **kwargs)
+        if assume_real:
+            h = np.real(h).astype(complex)
+        v,vv = scipy.linalg.eigh(h,s)
+        return v, vv
+
+    if stabilizer and cache is not None:
+        raise TequilaException("krylov_method: stabilizer and cache can not be used together")
+    if stabilizer is None:
+        # positional simulation options after the variables are samples, backend, noise, ...
+        stabilizer = cache is None and len(args) < 2 and "samples" not in kwargs and "noise" not in kwargs and \
+                     all(is_clifford(U, variables) for U in krylov_circs)
+    if stabilizer:
+        h, s = _stabilizer_matrices(krylov_circs, operators, overlaps, variables, assume_real)
+        v,vv = scipy.linalg.eigh(h,s)
+        return v, vv
+
+    if cache is not None:
+        if cache is True:
+            cache = default_cache
+        h, s = _cached_matrices(krylov_circs, operators, overlaps, variables, assume_real, cache, *args, **kwargs)
+        v,vv = scipy.linalg.eigh(h,s)
+        return v, vv
+
     HM = tq.QTensor(shape=[n_krylov_states,n_krylov_states])
     SM = tq.QTensor(shape=[n_krylov_states,n_krylov_states])
     
@@ -34,21 +135,118 @@ def krylov_method(krylov_circs:list, H:QubitHamiltonian, variables:dict=None, as
         krylov_circs_x = copy.deepcopy(krylov_circs)
 
     for i in range(n_krylov_states):
-        for j in range(i,n_krylov_states):
+        HM[i,i] = braket(ket=krylov_circs_x[i], operator=operators[i,i])
+        SM[i,i] = tq.Objective() + 1.0
+        for j in range(i+1,n_krylov_states):
             if assume_real:
-                h_real = braket(bra=krylov_circs_x[i], ket=krylov_circs_x[j], operator=H)[0]
+                h_real = braket(bra=krylov_circs_x[i], ket=krylov_circs_x[j], operator=operators[i,j])[0]
                 h_im = 0
             else:
-                h_real, h_im = braket(bra=krylov_circs_x[i], ket=krylov_circs_x[j], operator=H)
+                h_real, h_im = braket(bra=krylov_circs_x[i], ket=krylov_circs_x[j], operator=operators[i,j])
             HM[i,j] = h_real + 1j*h_im
             HM[j,i] = h_real - 1j*h_im
+            if not overlaps[i,j]:
+                SM[i,j] = SM[j,i] = tq.Objective()
+                continue
             s_real, s_im = braket(bra=krylov_circs_x[i], ket=krylov_circs_x[j])
             SM[i,j] = s_real + 1j*s_im
             SM[j,i] = s_real - 1j*s_im
 
-    h = tq.simulate(HM, *args, **kwargs) 
-    s = tq.simulate(SM, *args, **kwargs)
+    if deduplicate is None:
+        options = simulate_options(args, kwargs)
+        deduplicate = options.get("samples") is None and options.get("noise") is None
+    if deduplicate:
+        h, s = simulate_deduplicated([HM, SM], *args, info=info, **kwargs)
+    else:
+        h = tq.simulate(HM, *args, **kwargs)
+        s = tq.simulate(SM, *args, **kwargs)
 
     v,vv = scipy.linalg.eigh(h,s)
 
     return v, vv
+
+
+def _screen(krylov_circs:list, H:QubitHamiltonian, variables:dict, symmetries:list, info:dict)->tuple:
+    """Determines for each couple of Krylov states (i <= j) the Pauli strings of H connecting
+    their symmetry sectors and whether their overlap can be non-zero."""
+    n_krylov_states = len(krylov_circs)
+    operators = {}
+    overlaps = {}
+    screened_terms = 0
+    screened_overlaps = 0
+
+    if symmetries is None:
+        sectors = [tuple() for U in krylov_circs]
+        symmetries = []
+    else:
+        if isinstance(symmetries, str) and symmetries == "auto":
+            symmetries = detect_symmetries(krylov_circs, variables)
+        sectors = [tuple(symmetry_sector(U, symmetry, variables) for symmetry in symmetries) for U in krylov_circs]
+
+    for i in range(n_krylov_states):
+        for j in range(i,n_krylov_states):
+            operators[i,j] = screen_operator(H, sectors[i], sectors[j], symmetries) if symmetries else H
+            overlaps[i,j] = same_sector(sectors[i], sectors[j])
+            screened_terms += len(H.paulistrings) - len(operators[i,j].paulistrings)
+            screened_overlaps += not overlaps[i,j]
+
+    if info is not None:
+        info["screened_terms"] = screened_terms
+        info["screened_overlaps"] = screened_overlaps
+
+    return operators, overlaps
+
+
+def _stabilizer_matrices(krylov_circs:list, operators:dict, overlaps:dict, variables:dict, assume_real:bool)->tuple:
+    """Evaluates the Krylov matrices of Clifford circuits with `stabilizer_braket`."""
+    n_krylov_states = len(krylov_circs)
+    h = np.zeros([n_krylov_states,n_krylov_states], dtype=complex)
+    s = np.eye(n_krylov_states, dtype=complex)
+
+    for i in range(n_krylov_states):
+        h[i,i] = stabilizer_braket(krylov_circs[i], operator=operators[i,i], variables=variables)
+        for j in range(i+1,n_krylov_states):
+            h_real, h_im = stabilizer_braket(bra=krylov_circs[i], ket=krylov_circs[j], operator=operators[i,j],
+                                             variables=variables)
+            if assume_real:
+                h_im = 0
+            h[i,j] = h_real + 1j*h_im
+            h[j,i] = h_real - 1j*h_im
+            if overlaps[i,j]:
+                s_real, s_im = stabilizer_braket(bra=krylov_circs[i], ket=krylov_circs[j], variables=variables)
+                s[i,j] = s_real + 1j*s_im
+                s[j,i] = s_real - 1j*s_im
+
+    return h, s
+
+
+def _cached_matrices(krylov_circs:list, operators:dict, overlaps:dict, variables:dict, assume_real:bool,
+                     cache:CompiledObjectiveCache, *args, **kwargs)->tuple:
+    """Evaluates the Krylov matrices with `cached_braket`, returns them as numpy arrays.
+    The positional arguments are the ones of `tq.simulate`: they are passed to `tq.compile` by name,
+    except for the variables since the angles of the circuits are set by `cached_braket`."""
+    kwargs = simulate_options(args, kwargs)
+    kwargs.pop("variables", None)
+    n_krylov_states = len(krylov_circs)
+    h = np.zeros([n_krylov_states,n_krylov_states], dtype=complex)
+    s = np.zeros([n_krylov_states,n_krylov_states], dtype=complex)
+
+    for i in range(n_krylov_states):
+        h[i,i] = cached_braket(krylov_circs[i], operator=operators[i,i], variables=variables, cache=cache,
+                               **kwargs)
+        s[i,i] = 1.0
+        for j in range(i+1,n_krylov_states):
+            h_real, h_im = cached_braket(bra=krylov_circs[i], ket=krylov_circs[j], operator=operators[i,j],
+                                         variables=variables, cache=cache, **kwargs)
+            if assume_real:
+                h_im = 0
+            h[i,j] = h_real + 1j*h_im
+            h[j,i] = h_real - 1j*h_im
+            if not overlaps[i,j]:
+                continue
+            s_real, s_im = cached_braket(bra=krylov_circs[i], ket=krylov_circs[j], variables=variables,
+                                         cache=cache, **kwargs)
+            s[i,j] = s_real + 1j*s_im
+            s[j,i] = s_real - 1j*s_im
+
+    return h, s
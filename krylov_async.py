@@ -0,0 +1,208 @@
+import asyncio
+import copy
+import scipy
+import numpy as np
+import tequila as tq
+from tequila.circuit.circuit import QCircuit
+from tequila.circuit.gates import PauliGate
+from tequila.hamiltonian.qubit_hamiltonian import QubitHamiltonian
+from tequila.objective.objective import ExpectationValue
+
+from braket import make_overlap
+
+
+class SimulatorBackend:
+    """Local stand-in for a queue-based execution service.
+    Every submitted objective waits for `latency` seconds (the queueing and
+    round-trip time of the remote service) and is then simulated with `tq.simulate`
+    in a worker thread, so that several submissions can be in flight at once.
+    Optional arguments (*args, **kwargs) are passed to `tq.simulate`.
+
+    Args:
+        latency (float, optional): Seconds each job spends waiting before execution. Defaults to 0.
+    """
+
+    def __init__(self, latency: float = 0.0, *args, **kwargs):
+        self.latency = latency
+        self.args = args
+        self.kwargs = kwargs
+
+    async def submit(self, objective) -> float:
+        """Submits one objective and waits for its result.
+
+        Args:
+            objective (Objective): Tequila objective to be evaluated.
+
+        Returns:
+            float: value of the objective.
+        """
+        await asyncio.sleep(self.latency)
+        return await asyncio.to_thread(tq.simulate, objective, *self.args, **self.kwargs)
+
+
+def braket_jobs(ket: QCircuit, bra: QCircuit = None, operator: QubitHamiltonian = None) -> list:
+    """Function that splits the quantity computed by `braket` into independent jobs.
+    Each job is a couple (weight, objective) and the result of `braket` is
+    the sum of weight*value(objective) over all the jobs, where the weights are complex.
+    Transition elements are split into one Hadamard test per Pauli string,
+    so that all of them can be submitted concurrently.
+
+    Args:
+        ket (QCircuit): QCircuit corresponding to a state.
+        bra (QCircuit, optional): QCircuit corresponding to a second state. Defaults to None.
+        operator (QubitHamiltonian, optional): Operator of which we want to
+                                               calculate the transition element. Defaults to None.
+
+    Returns:
+        list: list of (weight, objective) couples.
+    """
+    if bra is None:
+        bra = ket
+
+    if id(ket) == id(bra):
+        if operator is None:
+            return []
+        return [(1.0, ExpectationValue(H=operator, U=ket))]
+
+    if operator is None:
+        objective_real, objective_im = make_overlap(U0=ket, U1=bra)
+        return [(1.0, objective_real), (1.0j, objective_im)]
+
+    jobs = []
+    for ps in operator.paulistrings:
+        c_k = ps.coeff
+        objective_real, objective_im = make_overlap(U0=ket, U1=bra + PauliGate(ps))
+        jobs += [(c_k, objective_real), (1.0j*c_k, objective_im)]
+
+    return jobs
+
+
+async def _submit(backend, objective, semaphore: asyncio.Semaphore, max_retries: int, retry_delay: float) -> float:
+    """Submits one objective to the backend, holding one of the in-flight slots
+    of the semaphore. Failed submissions are retried up to `max_retries` times
+    with exponential backoff, after that the last exception is raised."""
+    for attempt in range(max_retries + 1):
+        async with semaphore:
+            try:
+                return await backend.submit(objective)
+            except Exception:
+                if attempt == max_retries:
+                    raise
+        await asyncio.sleep(retry_delay * 2**attempt)
+
+
+async def _collect(jobs: list, backend, semaphore: asyncio.Semaphore, max_retries: int, retry_delay: float) -> complex:
+    """Submits all the jobs concurrently and sums up the weighted results."""
+    values = await asyncio.gather(*[_submit(backend, objective, semaphore, max_retries, retry_delay)
+                                    for _, objective in jobs])
+    return sum(weight*value for (weight, _), value in zip(jobs, values))
+
+
+async def braket_async(ket: QCircuit, bra: QCircuit = None, operator: QubitHamiltonian = None, *args,
+                       backend=None, max_in_flight: int = 16, max_retries: int = 3, retry_delay: float = 0.1,
+                       **kwargs):
+    """Asynchronous version of `braket`: instead of returning the objectives
+    it submits them concurrently to the backend and returns their values.
+    If no backend is given, a `SimulatorBackend` without latency is created
+    with the optional arguments (*args, **kwargs).
+
+    Args:
+        ket (QCircuit): QCircuit corresponding to a state.
+        bra (QCircuit, optional): QCircuit corresponding to a second state. Defaults to None.
+        operator (QubitHamiltonian, optional): Operator of which we want to
+                                               calculate the transition element. Defaults to None.
+        backend (optional): Object with an asynchronous `submit(objective)` method. Defaults to None.
+        max_in_flight (int, optional): Maximum number of jobs submitted at the same time. Defaults to 16.
+        max_retries (int, optional): Number of times a failed job is resubmitted. Defaults to 3.
+        retry_delay (float, optional): Delay in seconds before the first retry, doubled at each retry.
+                                       Defaults to 0.1.
+
+    Returns:
+        1, expectation value or tuple with real and imaginary part of the
+        overlap or of the transition element depending on the inputs.
+    """
+    if backend is None:
+        backend = SimulatorBackend(0.0, *args, **kwargs)
+
+    if bra is None:
+        bra = ket
+
+    semaphore = asyncio.Semaphore(max_in_flight)
+    value = await _collect(braket_jobs(ket=ket, bra=bra, operator=operator), backend, semaphore,
+                           max_retries, retry_delay)
+
+    if id(ket) == id(bra):
+        if operator is None:
+            return 1.0
+        return np.real(value)
+
+    return np.real(value), np.imag(value)
+
+
+async def krylov_method_async(krylov_circs: list, H: QubitHamiltonian, variables: dict = None,
+                              assume_real: bool = False, *args, backend=None, max_in_flight: int = 16,
+                              max_retries: int = 3, retry_delay: float = 0.1, **kwargs) -> tuple:
+    """Asynchronous version of `krylov_method`. All the circuits needed for
+    the Krylov matrices are submitted concurrently to the backend, with at most
+    `max_in_flight` jobs waiting for a result at the same time, so that with a
+    high latency backend the whole matrix costs roughly one round trip.
+    If no backend is given, a `SimulatorBackend` without latency is created
+    with the optional arguments (*args, **kwargs).
+
+    Args:
+        krylov_circs (list): List of Krylov circuits.
+        H (QubitHamiltonian): Hamiltonian on which we want to apply Krylov method
+        variables (dict, optional): Dicitionary containing possible variables to be stored in the Krylov circuits.
+        Defaults to None.
+        assume_real (bool): If set to True the function does not compute the imaginary part.
+        Default to False.
+        backend (optional): Object with an asynchronous `submit(objective)` method. Defaults to None.
+        max_in_flight (int, optional): Maximum number of jobs submitted at the same time. Defaults to 16.
+        max_retries (int, optional): Number of times a failed job is resubmitted. Defaults to 3.
+        retry_delay (float, optional): Delay in seconds before the first retry, doubled at each retry.
+                                       Defaults to 0.1.
+
+    Returns:
+        tuple(np.ndarray, np.ndarray): array of energies, array of krylov coefficients corresponding to the energies
+    """
+    if backend is None:
+        backend = SimulatorBackend(0.0, *args, **kwargs)
+
+    n_krylov_states = len(krylov_circs)
+
+    if variables is not None:
+        krylov_circs_x = [U.map_variables(variables) for U in krylov_circs]
+    else:
+        krylov_circs_x = copy.deepcopy(krylov_circs)
+
+    semaphore = asyncio.Semaphore(max_in_flight)
+    elements = []
+    tasks = []
+    for i in range(n_krylov_states):
+        for j in range(i, n_krylov_states):
+            h_jobs = braket_jobs(bra=krylov_circs_x[i], ket=krylov_circs_x[j], operator=H)
+            if assume_real:
+                h_jobs = [(weight, objective) for weight, objective in h_jobs if np.isreal(weight)]
+            s_jobs = braket_jobs(bra=krylov_circs_x[i], ket=krylov_circs_x[j])
+            elements.append((i, j))
+            tasks.append(_collect(h_jobs, backend, semaphore, max_retries, retry_delay))
+            tasks.append(_collect(s_jobs, backend, semaphore, max_retries, retry_delay))
+
+    values = await asyncio.gather(*tasks)
+
+    h = np.zeros([n_krylov_states, n_krylov_states], dtype=complex)
+    s = np.zeros([n_krylov_states, n_krylov_states], dtype=complex)
+    for k, (i, j) in enumerate(elements):
+        h_value, s_value = values[2*k], values[2*k+1]
+        if i == j:
+            s_value = 1.0
+        if assume_real:
+            h_value = np.real(h_value)
+        h[i, j] = h_value
+        h[j, i] = np.conj(h_value)
+        s[i, j] = s_value
+        s[j, i] = np.conj(s_value)
+
+    v,vv = scipy.linalg.eigh(h,s)
+
+    return v, vv
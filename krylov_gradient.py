@@ -0,0 +1,180 @@
+import scipy
+import numpy as np
+import tequila as tq
+from tequila import TequilaException
+from tequila.autograd_imports import __AUTOGRAD__BACKEND__
+from tequila.hamiltonian.qubit_hamiltonian import QubitHamiltonian
+from tequila.objective.objective import Objective
+
+from braket import braket
+
+
+def krylov_objectives(krylov_circs: list, H: QubitHamiltonian, assume_real: bool = False) -> dict:
+    """Function that collects the real objectives needed for the Krylov matrices,
+    without fixing the variables of the circuits.
+
+    Args:
+        krylov_circs (list): List of Krylov circuits.
+        H (QubitHamiltonian): Hamiltonian on which we want to apply Krylov method
+        assume_real (bool): If set to True the imaginary part of H is not computed. Default to False.
+
+    Returns:
+        dict: dictionary {(i, j, name): objective} for i <= j, where name is one among
+        "h_real", "h_im", "s_real" and "s_im". Elements which are known constants
+        (diagonal of S and imaginary part of the diagonal of H) are not included.
+    """
+    objectives = {}
+    n_krylov_states = len(krylov_circs)
+    for i in range(n_krylov_states):
+        objectives[(i, i, "h_real")] = braket(ket=krylov_circs[i], operator=H)
+        for j in range(i+1, n_krylov_states):
+            h_real, h_im = braket(bra=krylov_circs[i], ket=krylov_circs[j], operator=H)
+            s_real, s_im = braket(bra=krylov_circs[i], ket=krylov_circs[j])
+            objectives[(i, j, "h_real")] = h_real
+            if not assume_real:
+                objectives[(i, j, "h_im")] = h_im
+            objectives[(i, j, "s_real")] = s_real
+            objectives[(i, j, "s_im")] = s_im
+
+    return objectives
+
+
+def _assemble(values: dict, keys: list, n_krylov_states: int, diagonal_s: float) -> tuple:
+    """Builds the hermitian H and S matrices from the values of the objectives."""
+    h = np.zeros([n_krylov_states, n_krylov_states], dtype=complex)
+    s = np.zeros([n_krylov_states, n_krylov_states], dtype=complex)
+    for i in range(n_krylov_states):
+        s[i, i] = diagonal_s
+    for key in keys:
+        i, j, name = key
+        matrix = h if name.startswith("h") else s
+        if name.endswith("real"):
+            matrix[i, j] += values[key]
+            if i != j:
+                matrix[j, i] += values[key]
+        else:
+            matrix[i, j] += 1j*values[key]
+            matrix[j, i] -= 1j*values[key]
+
+    return h, s
+
+
+def krylov_gradient(krylov_circs: list, H: QubitHamiltonian, variables: dict, assume_real: bool = False,
+                    *args, **kwargs) -> tuple:
+    """Function that computes the Krylov ground state energy together with its
+    analytic gradient with respect to the variables of the Krylov circuits.
+    The gradient follows from the generalized Hellmann-Feynman theorem
+        dE = c^dagger (dH - E dS) c,
+    with c the ground state coefficients normalized as c^dagger S c = 1,
+    where the derivatives dH and dS of the Krylov matrices are obtained with
+    the parameter shift rule applied to the braket objectives (`tq.grad`).
+    All the objectives, matrices and derivatives, are evaluated in a single
+    batched simulation of a QTensor.
+    Optional function arguments (*args, **kwargs) allows to change simulation options.
+
+    Args:
+        krylov_circs (list): List of Krylov circuits.
+        H (QubitHamiltonian): Hamiltonian on which we want to apply Krylov method
+        variables (dict): Dicitionary containing the values of the variables of the Krylov circuits.
+        assume_real (bool): If set to True the function does not compute the imaginary part of H.
+        Default to False.
+
+    Returns:
+        tuple(float, dict): ground state energy, dictionary {variable: derivative of the energy}
+    """
+    n_krylov_states = len(krylov_circs)
+    objectives = krylov_objectives(krylov_circs, H, assume_real=assume_real)
+    keys = list(objectives.keys())
+
+    parameters = []
+    for objective in objectives.values():
+        parameters += [p for p in objective.extract_variables() if p not in parameters]
+
+    batch = tq.QTensor(shape=[len(parameters)+1, len(keys)])
+    for k, key in enumerate(keys):
+        batch[0, k] = objectives[key]
+        for p, parameter in enumerate(parameters):
+            batch[p+1, k] = tq.grad(objectives[key], parameter)
+
+    values = tq.simulate(batch, variables, *args, **kwargs)
+
+    h, s = _assemble(dict(zip(keys, values[0])), keys, n_krylov_states, diagonal_s=1.0)
+    v, vv = scipy.linalg.eigh(h, s)
+    energy = v[0]
+    c = vv[:, 0]
+
+    gradient = {}
+    for p, parameter in enumerate(parameters):
+        dh, ds = _assemble(dict(zip(keys, values[p+1])), keys, n_krylov_states, diagonal_s=0.0)
+        gradient[parameter] = np.real(np.conj(c) @ (dh - energy*ds) @ c)
+
+    return energy, gradient
+
+
+def _energy_derivatives(x: np.ndarray, keys: tuple, n_krylov_states: int) -> tuple:
+    """Ground state energy of the Krylov matrices built from the values x of the objectives,
+    and its derivatives with respect to x from dE = c^dagger (dH - E dS) c."""
+    h, s = _assemble(dict(zip(keys, x)), keys, n_krylov_states, diagonal_s=1.0)
+    v, vv = scipy.linalg.eigh(h, s)
+    energy = v[0]
+    c = vv[:, 0]
+
+    derivatives = np.zeros(len(keys))
+    for k, (i, j, name) in enumerate(keys):
+        w = np.conj(c[i])*c[j]
+        if name.endswith("real"):
+            derivatives[k] = np.real(w) if i == j else 2*np.real(w)
+        else:
+            derivatives[k] = -2*np.imag(w)
+        if name.startswith("s"):
+            derivatives[k] *= -energy
+
+    return energy, derivatives
+
+
+if __AUTOGRAD__BACKEND__ == "autograd":
+    from autograd.extend import primitive, defvjp
+    from autograd import numpy as anp
+
+    @primitive
+    def _ground_state_energy(x, keys, n_krylov_states):
+        return _energy_derivatives(x, keys, n_krylov_states)[0]
+
+    defvjp(_ground_state_energy,
+           lambda ans, x, keys, n_krylov_states: lambda g: g*_energy_derivatives(x, keys, n_krylov_states)[1])
+
+
+def krylov_energy(krylov_circs: list, H: QubitHamiltonian, assume_real: bool = False) -> Objective:
+    """Function that returns the Krylov ground state energy as a tequila objective of the variables
+    of the Krylov circuits, which can be simulated, differentiated with `tq.grad` and optimized with
+    `tq.minimize` like any other objective. Its arguments are the expectation values of all the braket
+    objectives, and its transformation is the lowest generalized eigenvalue of the Krylov matrices,
+    differentiated with the generalized Hellmann-Feynman theorem (see `krylov_gradient`).
+    It requires the autograd differentiation backend of tequila.
+
+    Args:
+        krylov_circs (list): List of Krylov circuits.
+        H (QubitHamiltonian): Hamiltonian on which we want to apply Krylov method
+        assume_real (bool): If set to True the imaginary part of H is not computed. Default to False.
+
+    Returns:
+        Objective: ground state energy.
+    """
+    if __AUTOGRAD__BACKEND__ != "autograd":
+        raise TequilaException("krylov_energy: only the autograd differentiation backend is supported")
+
+    objectives = krylov_objectives(krylov_circs, H, assume_real=assume_real)
+    keys = tuple(objectives.keys())
+
+    args = []
+    parts = []
+    for key in keys:
+        objective = objectives[key]
+        parts.append((len(args), len(args) + len(objective.args), objective.transformation))
+        args += list(objective.args)
+
+    def transformation(*values):
+        x = anp.array([f(*values[start:stop]) for start, stop, f in parts])
+        return _ground_state_energy(x, keys, len(krylov_circs))
+
+    return Objective(args=args, transformation=transformation)
@@ -0,0 +1,248 @@
+import numpy as np
+from tequila.circuit.circuit import QCircuit
+from tequila.hamiltonian.qubit_hamiltonian import QubitHamiltonian
+
+from gate_matrices import PAULI_MATRICES, gate_matrix
+
+SWAP_MATRIX = np.array([[1, 0, 0, 0], [0, 0, 1, 0], [0, 1, 0, 0], [0, 0, 0, 1]], dtype=complex)
+
+
+class MPS:
+    """Matrix product state of a register of qubits, stored as one tensor of shape
+    (left bond, 2, right bond) per qubit and kept in mixed canonical form around `center`.
+    Gates are applied by contracting the tensors of their qubits (brought next to each other
+    with SWAP gates if needed) and splitting the result with SVDs, keeping at most
+    max_bond_dimension singular values: the discarded weight (sum of the discarded squared
+    singular values, relative to the norm of the state) is accumulated in `truncation_error`.
+
+    Args:
+        qubits (list): qubits of the state, initialized in |0...0>.
+        max_bond_dimension (int, optional): maximum bond dimension. Defaults to 64.
+        cutoff (float, optional): singular values smaller than cutoff are always discarded. Defaults to 1.e-14.
+    """
+
+    def __init__(self, qubits: list, max_bond_dimension: int = 64, cutoff: float = 1.e-14):
+        self.qubits = tuple(qubits)
+        self.position = {q: k for k, q in enumerate(self.qubits)}
+        self.max_bond_dimension = max_bond_dimension
+        self.cutoff = cutoff
+        self.tensors = []
+        for q in self.qubits:
+            tensor = np.zeros([1, 2, 1], dtype=complex)
+            tensor[0, 0, 0] = 1.0
+            self.tensors.append(tensor)
+        self.center = 0
+        self.truncation_error = 0.0
+
+    @property
+    def bond_dimension(self) -> int:
+        return max(tensor.shape[2] for tensor in self.tensors)
+
+    def _move_center(self, site: int):
+        """Moves the orthogonality center to site with QR decompositions."""
+        while self.center < site:
+            c = self.center
+            left, phys, right = self.tensors[c].shape
+            q, r = np.linalg.qr(self.tensors[c].reshape(left*phys, right))
+            self.tensors[c] = q.reshape(left, phys, -1)
+            self.tensors[c + 1] = np.tensordot(r, self.tensors[c + 1], axes=(1, 0))
+            self.center += 1
+        while self.center > site:
+            c = self.center
+            left, phys, right = self.tensors[c].shape
+            q, r = np.linalg.qr(self.tensors[c].reshape(left, phys*right).T)
+            self.tensors[c] = q.T.reshape(-1, phys, right)
+            self.tensors[c - 1] = np.tensordot(self.tensors[c - 1], r.T, axes=(2, 0))
+            self.center -= 1
+
+    def _apply_block(self, site: int, matrix: np.ndarray):
+        """Applies a matrix to the contiguous sites site, ..., site+k-1 (first site most significant)."""
+        k = int(np.log2(len(matrix)))
+        self._move_center(site)
+
+        theta = self.tensors[site]
+        for t in range(1, k):
+            theta = np.tensordot(theta, self.tensors[site + t], axes=(theta.ndim - 1, 0))
+        left, right = theta.shape[0], theta.shape[-1]
+        theta = np.einsum("ij,ajb->aib", matrix, theta.reshape(left, 2**k, right))
+
+        norm = np.linalg.norm(theta)
+        rest = theta
+        for t in range(k - 1):
+            u, s, vh = np.linalg.svd(rest.reshape(left*2, -1), full_matrices=False)
+            keep = min(self.max_bond_dimension, max(1, int(np.sum(s > self.cutoff*s[0]))))
+            discarded = np.sum(s[keep:]**2)
+            if discarded > 0:
+                self.truncation_error += discarded/np.sum(s**2)
+                s = s*norm/np.linalg.norm(s[:keep])
+            self.tensors[site + t] = u[:, :keep].reshape(left, 2, keep)
+            rest = s[:keep, None]*vh[:keep]
+            left = keep
+        self.tensors[site + k - 1] = rest.reshape(left, 2, right)
+        self.center = site + k - 1
+
+    def apply_gate(self, gate, variables: dict = None):
+        """Applies a gate to the state.
+
+        Args:
+            gate: tequila gate.
+            variables (dict, optional): Dictionary with the values of the variables of the gate. Defaults to None.
+        """
+        qubits, matrix = gate_matrix(gate, variables)
+        if len(qubits) == 0:
+            self.tensors[self.center] = self.tensors[self.center]*matrix[0, 0]
+            return
+
+        # brings the qubits of the gate next to the first one of them with SWAP gates
+        sites = sorted(self.position[q] for q in qubits)
+        order = [self.qubits[p] for p in sites]
+        swaps = []
+        for m in range(1, len(sites)):
+            for p in range(sites[m] - 1, sites[0] + m - 1, -1):
+                self._apply_block(p, SWAP_MATRIX)
+                swaps.append(p)
+
+        # matrix with the qubits in the order of the sites
+        k = len(qubits)
+        permutation = [qubits.index(q) for q in order]
+        matrix = matrix.reshape([2]*2*k).transpose(permutation + [k + p for p in permutation]).reshape(2**k, 2**k)
+        self._apply_block(sites[0], matrix)
+
+        for p in reversed(swaps):
+            self._apply_block(p, SWAP_MATRIX)
+
+    def apply_circuit(self, U: QCircuit, variables: dict = None):
+        for gate in U.gates:
+            self.apply_gate(gate, variables)
+
+    def inner(self, other, paulistring=None) -> complex:
+        """Computes <self|P|other>, where the Pauli string P is applied as a bond dimension one MPO.
+
+        Args:
+            other (MPS): state on the same qubits.
+            paulistring (PauliString, optional): Pauli string (its coefficient is ignored). Defaults to None.
+
+        Returns:
+            complex: transition element.
+        """
+        paulis = dict(paulistring.items()) if paulistring is not None else {}
+        environment = np.ones([1, 1], dtype=complex)
+        for q, a, b in zip(self.qubits, self.tensors, other.tensors):
+            if q in paulis:
+                b = np.einsum("st,atb->asb", PAULI_MATRICES[paulis[q].upper()], b)
+            environment = np.tensordot(environment, a.conj(), axes=(0, 0))
+            environment = np.tensordot(environment, b, axes=([0, 1], [0, 1]))
+        return environment[0, 0]
+
+    def transition(self, other, operator: QubitHamiltonian) -> complex:
+        """Computes <self|operator|other> as sum of the Pauli strings contributions."""
+        return sum(ps.coeff*self.inner(other, ps) for ps in operator.paulistrings)
+
+
+def simulate_mps(U: QCircuit, qubits: list = None, variables: dict = None, max_bond_dimension: int = 64) -> MPS:
+    """Function that simulates a circuit as a matrix product state.
+
+    Args:
+        U (QCircuit): circuit.
+        qubits (list, optional): qubits of the state. Defaults to the sorted qubits of the circuit.
+        variables (dict, optional): Dictionary with the values of the variables of the circuit. Defaults to None.
+        max_bond_dimension (int, optional): maximum bond dimension of the state. Defaults to 64.
+
+    Returns:
+        MPS: the state U|0...0>.
+    """
+    if qubits is None:
+        qubits = sorted(U.qubits)
+    state = MPS(qubits, max_bond_dimension=max_bond_dimension)
+    state.apply_circuit(U, variables)
+    return state
+
+
+def mps_braket(ket: QCircuit, bra: QCircuit = None, operator: QubitHamiltonian = None, variables: dict = None,
+               max_bond_dimension: int = 64, info: dict = None):
+    """Function that computes the same quantities of `braket` contracting the two states
+    as matrix product states, without the ancilla and the controlled circuits of the Hadamard test.
+    It is exact if the bond dimension of the states never exceeds max_bond_dimension.
+
+    Args:
+        ket (QCircuit): QCircuit corresponding to a state.
+        bra (QCircuit, optional): QCircuit corresponding to a second state. Defaults to None.
+        operator (QubitHamiltonian, optional): Operator of which we want to
+                                               calculate the transition element. Defaults to None.
+        variables (dict, optional): Dictionary with the values of the variables of the circuits. Defaults to None.
+        max_bond_dimension (int, optional): maximum bond dimension of the states. Defaults to 64.
+        info (dict, optional): If given, "truncation_error" is set to the sum of the weights discarded
+                               in the simulation of the two states. Defaults to None.
+
+    Returns:
+        1, expectation value or tuple with real and imaginary part of the
+        overlap or of the transition element depending on the inputs.
+    """
+    if bra is None:
+        bra = ket
+
+    same = id(ket) == id(bra)
+    if same and operator is None:
+        return 1.0
+
+    qubits = set(ket.qubits) | set(bra.qubits)
+    if operator is not None:
+        qubits |= set(operator.qubits)
+    qubits = sorted(qubits)
+
+    state_ket = simulate_mps(ket, qubits, variables, max_bond_dimension)
+    state_bra = state_ket if same else simulate_mps(bra, qubits, variables, max_bond_dimension)
+    if info is not None:
+        info["truncation_error"] = state_ket.truncation_error + (0.0 if same else state_bra.truncation_error)
+
+    if operator is None:
+        value = state_ket.inner(state_bra)
+    else:
+        value = state_ket.transition(state_bra, operator)
+
+    if same:
+        return np.real(value)
+    return np.real(value), np.imag(value)
+
+
+def mps_krylov_matrices(krylov_circs: list, operators: dict, overlaps: dict, variables: dict = None,
+                        max_bond_dimension: int = 64, info: dict = None) -> tuple:
+    """Function that computes the Krylov matrices simulating every Krylov state once as a matrix product state,
+    with the same convention of `krylov_method`: S_ij = <U_j|U_i> and H_ij = <U_j|H|U_i>.
+
+    Args:
+        krylov_circs (list): List of Krylov circuits.
+        operators (dict): operator of each element (i, j) with i <= j.
+        overlaps (dict): whether the overlap of each couple (i, j) with i < j can be non-zero.
+        variables (dict, optional): Dictionary with the values of the variables of the circuits. Defaults to None.
+        max_bond_dimension (int, optional): maximum bond dimension of the states. Defaults to 64.
+        info (dict, optional): If given, "truncation_error" is set to the largest weight discarded
+                               in the simulation of a Krylov state and "bond_dimension" to the largest
+                               bond dimension reached. Defaults to None.
+
+    Returns:
+        tuple(np.ndarray, np.ndarray): H and S matrices.
+    """
+    qubits = set(q for U in krylov_circs for q in U.qubits)
+    for operator in operators.values():
+        qubits |= set(operator.qubits)
+    qubits = sorted(qubits)
+
+    states = [simulate_mps(U, qubits, variables, max_bond_dimension) for U in krylov_circs]
+    if info is not None:
+        info["truncation_error"] = max(state.truncation_error for state in states)
+        info["bond_dimension"] = max(state.bond_dimension for state in states)
+
+    n_krylov_states = len(krylov_circs)
+    h = np.zeros([n_krylov_states, n_krylov_states], dtype=complex)
+    s = np.eye(n_krylov_states, dtype=complex)
+    for i in range(n_krylov_states):
+        h[i, i] = np.real(states[i].transition(states[i], operators[i, i]))
+        for j in range(i + 1, n_krylov_states):
+            h[j, i] = states[i].transition(states[j], operators[i, j])
+            h[i, j] = np.conj(h[j, i])
+            if overlaps[i, j]:
+                s[j, i] = states[i].inner(states[j])
+                s[i, j] = np.conj(s[j, i])
+
+    return h, s
@@ -0,0 +1,263 @@
+import copy
+import functools
+import numpy as np
+from tequila import TequilaException
+from tequila.circuit.circuit import QCircuit
+from tequila.circuit.gates import PauliGate
+from tequila.hamiltonian.qubit_hamiltonian import QubitHamiltonian
+
+from gate_matrices import PAULI_MATRICES, gate_matrix
+
+
+def _pauli_decomposition(matrix: np.ndarray, n_qubits: int) -> tuple:
+    """Writes a matrix as i^r X^x Z^z (x and z as integers, bits of the first qubit being the most
+    significant ones), using X^x Z^z|b> = (-1)^(z.b)|b xor x>. Returns None if it is not a Pauli operator."""
+    column = matrix[:, 0]
+    x = int(np.argmax(np.abs(column)))
+    phase = column[x]
+    if not np.isclose(abs(phase), 1.0, atol=1.e-8):
+        return None
+    r = int(np.rint(np.angle(phase)/(np.pi/2))) % 4
+    if not np.isclose(phase, 1j**r, atol=1.e-8):
+        return None
+    z = 0
+    for a in range(n_qubits):
+        bit = 1 << (n_qubits - 1 - a)
+        if np.isclose(matrix[bit ^ x, bit], -phase, atol=1.e-8):
+            z |= bit
+
+    basis = np.arange(2**n_qubits)
+    signs = 1 - 2*(np.array([bin(b & z).count("1") for b in basis]) % 2)
+    expected = np.zeros_like(matrix)
+    expected[basis ^ x, basis] = 1j**r*signs
+    if not np.allclose(matrix, expected, atol=1.e-8):
+        return None
+
+    return x, z, r
+
+
+@functools.lru_cache(maxsize=1024)
+def _conjugation_table(n_qubits: int, matrix_bytes: bytes) -> tuple:
+    """Computes the images U G U^dagger = i^r' X^x' Z^z' of the 2k generators G = X_1, ..., X_k, Z_1, ..., Z_k
+    of the local Pauli group under a gate U, which determine the image of every local Pauli operator.
+    Returns the tables (x', z', r') (one row per generator) or None if U is not a Clifford gate."""
+    matrix = np.frombuffer(matrix_bytes, dtype=complex).reshape(2**n_qubits, 2**n_qubits)
+    k = n_qubits
+    tx = np.zeros([2*k, k], dtype=bool)
+    tz = np.zeros([2*k, k], dtype=bool)
+    tr = np.zeros(2*k, dtype=int)
+    for g in range(2*k):
+        generator = np.ones([1, 1], dtype=complex)
+        for a in range(k):
+            local = "I" if a != g % k else ("X" if g < k else "Z")
+            generator = np.kron(generator, PAULI_MATRICES[local])
+        image = _pauli_decomposition(matrix @ generator @ matrix.conj().T, k)
+        if image is None:
+            return None
+        x, z, tr[g] = image
+        tx[g] = [(x >> (k - 1 - a)) & 1 for a in range(k)]
+        tz[g] = [(z >> (k - 1 - a)) & 1 for a in range(k)]
+
+    return tx, tz, tr
+
+
+def _surely_not_clifford(gate, variables: dict = None) -> bool:
+    """Cheap test on the angle of a gate, before building any matrix: a rotation exp(-i angle/2 c P)
+    (possibly plus identity) is not Clifford unless angle*c is a multiple of pi/2, or of pi if controlled,
+    and gates with more than one control are not considered as Clifford gates."""
+    if len(gate.control) > 1:
+        return True
+    generator = getattr(gate, "generator", None)
+    if generator is None:
+        return False
+    strings = [ps for ps in generator.paulistrings if len(ps.items())]
+    if len(strings) != 1:
+        return False
+    angle = float(gate.parameter(variables)) if gate.is_parameterized() else np.pi
+    quarters = angle*np.real(strings[0].coeff)/(np.pi/2)
+    if not np.isclose(quarters, np.rint(quarters), atol=1.e-8):
+        return True
+    return len(gate.control) == 1 and int(np.rint(quarters)) % 2 == 1
+
+
+class StabilizerState:
+    """Stabilizer state stored as a tableau of n commuting generators i^r X^x Z^z, kept
+    in row-reduced form with respect to the X part, together with one computational basis
+    state and its amplitude. The amplitude makes the global phase well defined, so that
+    overlaps and transition elements (not only their magnitudes) can be computed.
+
+    Args:
+        qubits (list): qubits of the state, initialized in |0...0>.
+    """
+
+    def __init__(self, qubits: list):
+        self.qubits = tuple(qubits)
+        self.position = {q: k for k, q in enumerate(self.qubits)}
+        n = len(self.qubits)
+        self.x = np.zeros([n, n], dtype=bool)
+        self.z = np.eye(n, dtype=bool)
+        self.r = np.zeros(n, dtype=int)
+        self.pivots = []
+        self.basis = np.zeros(n, dtype=bool)
+        self.amplitude = 1.0 + 0.0j
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+    def _reduce(self):
+        """Gaussian elimination of the X part of the generators, multiplying rows with their phases."""
+        n = len(self.qubits)
+        self.pivots = []
+        row = 0
+        for col in range(n):
+            candidates = np.nonzero(self.x[row:, col])[0]
+            if len(candidates) == 0:
+                continue
+            p = row + candidates[0]
+            for table in [self.x, self.z, self.r]:
+                table[[row, p]] = table[[p, row]]
+            others = np.nonzero(self.x[:, col])[0]
+            others = others[others != row]
+            self.r[others] = (self.r[others] + self.r[row] + 2*(self.z[others] & self.x[row]).sum(axis=1)) % 4
+            self.x[others] ^= self.x[row]
+            self.z[others] ^= self.z[row]
+            self.pivots.append((row, col))
+            row += 1
+            if row == n:
+                break
+
+    def amplitude_of(self, y: np.ndarray) -> complex:
+        """Amplitude <y|psi> of a computational basis state y (array of bits)."""
+        target = self.basis ^ y
+        x = np.zeros(len(self.qubits), dtype=bool)
+        z = np.zeros(len(self.qubits), dtype=bool)
+        r = 0
+        for row, col in self.pivots:
+            if target[col] != x[col]:
+                r = r + self.r[row] + 2*int(np.sum(z & self.x[row]))
+                x ^= self.x[row]
+                z ^= self.z[row]
+        if np.any(x != target):
+            return 0.0
+        return 1j**(r % 4) * (-1)**int(np.sum(z & self.basis)) * self.amplitude
+
+    def apply_gate(self, gate, variables: dict = None):
+        """Applies a Clifford gate to the state.
+
+        Args:
+            gate: tequila gate.
+            variables (dict, optional): Dictionary with the values of the variables of the gate. Defaults to None.
+        """
+        qubits, matrix = gate_matrix(gate, variables)
+        if len(qubits) == 0:
+            self.amplitude *= matrix[0, 0]
+            return
+        table = _conjugation_table(len(qubits), np.ascontiguousarray(matrix).tobytes())
+        if table is None:
+            raise TequilaException("StabilizerState: gate {} is not a Clifford gate".format(gate))
+        positions = [self.position[q] for q in qubits]
+        k = len(positions)
+
+        # amplitude of the tracked basis state and of its neighbours on the gate qubits
+        old = np.zeros(2**k, dtype=complex)
+        for pattern in range(2**k):
+            y = self.basis.copy()
+            y[positions] = [(pattern >> (k - 1 - a)) & 1 for a in range(k)]
+            old[pattern] = self.amplitude_of(y)
+        new = matrix @ old
+        best = np.argmax(np.abs(new))
+        self.basis[positions] = [(best >> (k - 1 - a)) & 1 for a in range(k)]
+        self.amplitude = new[best]
+
+        # conjugation of the stabilizers: on the gate qubits X^x Z^z = X_1^x_1 ... X_k^x_k Z_1^z_1 ... Z_k^z_k,
+        # whose image is the product of the images of the generators
+        tx, tz, tr = table
+        local = np.concatenate([self.x[:, positions], self.z[:, positions]], axis=1)
+        x = np.zeros([len(self.qubits), k], dtype=bool)
+        z = np.zeros([len(self.qubits), k], dtype=bool)
+        r = self.r.copy()
+        for g in range(2*k):
+            rows = local[:, g]
+            r[rows] += tr[g] + 2*(z[rows] & tx[g]).sum(axis=1)
+            x[rows] ^= tx[g]
+            z[rows] ^= tz[g]
+        self.x[:, positions] = x
+        self.z[:, positions] = z
+        self.r = r % 4
+        self._reduce()
+
+    def apply_circuit(self, U: QCircuit, variables: dict = None):
+        for gate in U.gates:
+            self.apply_gate(gate, variables)
+
+
+def is_clifford(U: QCircuit, variables: dict = None) -> bool:
+    """Function that checks if all the gates of a circuit are Clifford gates
+    (H, S, CNOT, Pauli gates, rotations by multiples of pi/2, ...).
+
+    Args:
+        U (QCircuit): circuit.
+        variables (dict, optional): Dictionary with the values of the variables of the circuit. Defaults to None.
+
+    Returns:
+        bool: True if the circuit can be simulated with `StabilizerState`.
+    """
+    for gate in U.gates:
+        try:
+            if _surely_not_clifford(gate, variables):
+                return False
+            qubits, matrix = gate_matrix(gate, variables)
+        except Exception:
+            return False
+        if len(qubits) and _conjugation_table(len(qubits), np.ascontiguousarray(matrix).tobytes()) is None:
+            return False
+    return True
+
+
+def stabilizer_braket(ket: QCircuit, bra: QCircuit = None, operator: QubitHamiltonian = None,
+                      variables: dict = None):
+    """Function that computes the same quantities of `braket` for Clifford circuits,
+    in polynomial time with the stabilizer formalism: <ket|P_k|bra> is the amplitude
+    of |0...0> in the state obtained applying bra, P_k and the inverse of ket to |0...0>.
+
+    Args:
+        ket (QCircuit): Clifford circuit corresponding to a state.
+        bra (QCircuit, optional): Clifford circuit corresponding to a second state. Defaults to None.
+        operator (QubitHamiltonian, optional): Operator of which we want to
+                                               calculate the transition element. Defaults to None.
+        variables (dict, optional): Dictionary with the values of the variables of the circuits. Defaults to None.
+
+    Returns:
+        1, expectation value or tuple with real and imaginary part of the
+        overlap or of the transition element depending on the inputs.
+    """
+    if bra is None:
+        bra = ket
+
+    same = id(ket) == id(bra)
+    if same and operator is None:
+        return 1.0
+
+    qubits = set(ket.qubits) | set(bra.qubits)
+    if operator is not None:
+        qubits |= set(operator.qubits)
+    zero = np.zeros(len(qubits), dtype=bool)
+
+    state = StabilizerState(sorted(qubits))
+    state.apply_circuit(bra, variables)
+    ket_dagger = ket.dagger()
+
+    if operator is None:
+        state.apply_circuit(ket_dagger, variables)
+        value = state.amplitude_of(zero)
+    else:
+        value = 0.0
+        for ps in operator.paulistrings:
+            term = state.copy()
+            term.apply_circuit(PauliGate(ps))
+            term.apply_circuit(ket_dagger, variables)
+            value += ps.coeff*term.amplitude_of(zero)
+
+    if same:
+        return np.real(value)
+    return np.real(value), np.imag(value)
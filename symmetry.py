@@ -0,0 +1,135 @@
+import numpy as np
+from tequila.circuit.circuit import QCircuit
+from tequila.hamiltonian import PauliString
+from tequila.hamiltonian.qubit_hamiltonian import QubitHamiltonian
+
+
+def _as_paulistring(symmetry) -> dict:
+    """Converts a symmetry given as PauliString, single-string QubitHamiltonian or str to a dict {qubit: pauli}."""
+    if isinstance(symmetry, str):
+        symmetry = QubitHamiltonian(symmetry)
+    if isinstance(symmetry, QubitHamiltonian):
+        assert len(symmetry.paulistrings) == 1, "symmetries have to be single Pauli strings"
+        symmetry = symmetry.paulistrings[0]
+    return dict(symmetry.items())
+
+
+def _commutes(a: dict, b: dict) -> bool:
+    """Two Pauli strings commute if they differ on an even number of shared qubits."""
+    return sum(1 for q, p in a.items() if q in b and b[q] != p) % 2 == 0
+
+
+def symmetry_sector(U: QCircuit, symmetry, variables: dict = None) -> int:
+    """Function that returns the eigenvalue (+1 or -1) of a Pauli symmetry on the state U|0...0>,
+    by following the symmetry through the gates of the circuit:
+    gates whose generator commutes with the symmetry keep the sector, uncontrolled Pauli gates
+    (and Pauli rotations by pi) anticommuting with it flip the sector,
+    any other gate makes the sector undefined.
+
+    Args:
+        U (QCircuit): circuit preparing the state.
+        symmetry (PauliString, QubitHamiltonian or str): Pauli string of the symmetry.
+        variables (dict, optional): Dictionary with the values of the variables of the circuit. Defaults to None.
+
+    Returns:
+        int: +1 or -1, None if the state is not an eigenstate of the symmetry (or it can not be proven).
+    """
+    symmetry = _as_paulistring(symmetry)
+    if any(p.upper() != "Z" for p in symmetry.values()):
+        # |0...0> is an eigenstate only of Z-type strings
+        return None
+
+    sector = 1
+    for gate in U.gates:
+        generator = gate.make_generator(include_controls=True)
+        if generator is None:
+            continue
+        strings = [dict(ps.items()) for ps in generator.paulistrings]
+        anticommuting = [ps for ps in strings if not _commutes(ps, symmetry)]
+        if not anticommuting:
+            continue
+        if gate.is_controlled() or len(anticommuting) != 1:
+            return None
+        if not gate.is_parameterized():
+            if gate.name.upper() in ["X", "Y", "Z"]:
+                sector *= -1
+                continue
+            return None
+        if len([ps for ps in strings if ps]) != 1:
+            return None
+        # exp(-i angle/2 c P): the coefficient of the Pauli string rescales the angle
+        coeff = [ps.coeff for ps in generator.paulistrings if not _commutes(dict(ps.items()), symmetry)][0]
+        try:
+            angle = float(gate.parameter(variables))*np.real(coeff)
+        except Exception:
+            return None
+        if np.isclose(np.cos(angle/2), 0.0):
+            sector *= -1
+        elif not np.isclose(np.sin(angle/2), 0.0):
+            return None
+
+    return sector
+
+
+def detect_symmetries(krylov_circs: list, variables: dict = None) -> list:
+    """Function that looks for Z-type symmetries shared by all the Krylov states:
+    the parity of all qubits, of even and odd qubits (spin parities in Jordan-Wigner
+    encodings with alternating spin orbitals) and the single-qubit Z operators.
+    A candidate is kept if every circuit prepares an eigenstate of it.
+
+    Args:
+        krylov_circs (list): List of Krylov circuits.
+        variables (dict, optional): Dictionary with the values of the variables of the circuits. Defaults to None.
+
+    Returns:
+        list: list of PauliString symmetries.
+    """
+    qubits = sorted(set(q for U in krylov_circs for q in U.qubits))
+    candidates = [qubits, qubits[0::2], qubits[1::2]] + [[q] for q in qubits]
+
+    symmetries = []
+    for candidate in candidates:
+        symmetry = PauliString(data={q: "Z" for q in candidate})
+        if not candidate or any(dict(s.items()) == dict(symmetry.items()) for s in symmetries):
+            continue
+        if all(symmetry_sector(U, symmetry, variables) is not None for U in krylov_circs):
+            symmetries.append(symmetry)
+
+    return symmetries
+
+
+def screen_operator(H: QubitHamiltonian, sector_i: tuple, sector_j: tuple, symmetries: list) -> QubitHamiltonian:
+    """Function that removes from an operator the Pauli strings P_k for which
+    <U_i|P_k|U_j> is zero by symmetry, i.e. such that sector_i != +-sector_j for a symmetry,
+    where the sign is + if P_k commutes with the symmetry and - otherwise.
+
+    Args:
+        H (QubitHamiltonian): operator.
+        sector_i (tuple): sectors of the first state, one for each symmetry (None if undefined).
+        sector_j (tuple): sectors of the second state, one for each symmetry (None if undefined).
+        symmetries (list): list of symmetries.
+
+    Returns:
+        QubitHamiltonian: operator with only the Pauli strings connecting the two sectors.
+    """
+    symmetries = [_as_paulistring(symmetry) for symmetry in symmetries]
+    paulistrings = []
+    for ps in H.paulistrings:
+        connected = True
+        for symmetry, s_i, s_j in zip(symmetries, sector_i, sector_j):
+            if s_i is None or s_j is None:
+                continue
+            sign = 1 if _commutes(dict(ps.items()), symmetry) else -1
+            if s_i != sign*s_j:
+                connected = False
+                break
+        if connected:
+            paulistrings.append(ps)
+
+    return QubitHamiltonian.from_paulistrings(paulistrings)
+
+
+def same_sector(sector_i: tuple, sector_j: tuple) -> bool:
+    """Function that checks if two states can have a non-zero overlap, i.e. if they are
+    in the same sector for all the symmetries for which both sectors are defined."""
+    return all(s_i == s_j for s_i, s_j in zip(sector_i, sector_j) if s_i is not None and s_j is not None)
@@ -0,0 +1,113 @@
+import warnings
+import numpy as np
+import tequila as tq
+from tequila.utils.exceptions import TequilaWarning
+
+from batched_simulator import apply_hamiltonian, batched_krylov_matrices, simulate_batch
+from krylov import krylov_method
+from random_generators import make_random_circuit, make_random_hamiltonian
+
+
+def make_template_circuit(angles: list) -> tq.QCircuit:
+    """Same circuit structure with different angles."""
+    U = tq.gates.Ry(angle=angles[0], target=0) + tq.gates.H(1) + tq.gates.CNOT(0, 2)
+    U += tq.gates.Rz(angle=angles[1], target=2, control=1) + tq.gates.ExpPauli(paulistring="X(0)Y(2)", angle=angles[2])
+    return U
+
+
+def test_simulate_batch():
+    """Function that compares overlaps and expectation values of the batched wavefunctions
+       with the ones of `tq.simulate`, for circuits with the same structure and for random circuits.
+    """
+    np.random.seed(111)
+    circuits = [make_template_circuit(np.random.rand(3)*np.pi) for i in range(3)]
+    circuits += [make_random_circuit(3, enable_controls=True) for i in range(2)]
+    # circuits of different structures interleaved, simulated in place in blocks of two states
+    circuits = [circuits[k] for k in [3, 0, 4, 1, 2]]
+    qubits = [0, 1, 2, 3]
+    H = make_random_hamiltonian(4, n_ps=3)
+
+    psi = simulate_batch(circuits, qubits=qubits, block_size=2*2**len(qubits))
+    wfns = [tq.simulate(U) for U in circuits]
+
+    for i in range(len(circuits)):
+        expectation_value = np.vdot(psi[i], apply_hamiltonian(psi[i:i+1], H, qubits)[0])
+        assert np.isclose(expectation_value, tq.simulate(tq.ExpectationValue(H=H, U=circuits[i])), atol=1.e-8)
+        for j in range(len(circuits)):
+            assert np.isclose(np.vdot(psi[i], psi[j]), wfns[i].inner(wfns[j]), atol=1.e-8)
+
+    return
+
+
+def test_apply_hamiltonian():
+    """Function that compares the batched application of an Hamiltonian with its matrix."""
+    np.random.seed(11)
+    circuits = [make_random_circuit(3) for i in range(2)]
+    H = make_random_hamiltonian(4, n_ps=5)
+    qubits = [0, 1, 2, 3]
+
+    psi = simulate_batch(circuits, qubits=qubits)
+
+    assert np.allclose(apply_hamiltonian(psi, H, qubits), psi @ H.to_matrix().T)
+    assert np.allclose(apply_hamiltonian(psi, H, qubits, 4, 12, block_size=3), (psi @ H.to_matrix().T)[:, 4:12])
+
+    return
+
+
+def test_krylov_batched():
+    """Function that checks that the batched Krylov matrices give the same energies as the objectives."""
+    np.random.seed(111)
+    krylov_circs = [make_template_circuit(np.random.rand(3)*np.pi) for i in range(3)]
+    H = make_random_hamiltonian(3, n_ps=4)
+
+    energies, _ = krylov_method(krylov_circs, H, batched=True)
+    correct_energies, _ = krylov_method(krylov_circs, H)
+
+    assert np.allclose(energies, correct_energies, atol=1e-4)
+
+    return
+
+
+def test_krylov_single_precision():
+    """Function that checks the complex64 mode: the matrices agree with double precision
+       to single precision accuracy and the accuracy check is reported.
+    """
+    np.random.seed(111)
+    krylov_circs = [make_template_circuit(np.random.rand(3)*np.pi) for i in range(3)]
+    H = make_random_hamiltonian(3, n_ps=4)
+
+    info = {}
+    h, s = batched_krylov_matrices(krylov_circs, H, precision="single", block_size=3, info=info)
+    correct_h, correct_s = batched_krylov_matrices(krylov_circs, H)
+
+    assert h.dtype == np.complex128
+    assert info["precision"] == "single"
+    assert info["spectrum_error"] < 1.e-5
+    assert np.allclose(h, correct_h, atol=1.e-5)
+    assert np.allclose(s, correct_s, atol=1.e-5)
+
+    energies, _ = krylov_method(krylov_circs, H, precision="single")
+    correct_energies, _ = krylov_method(krylov_circs, H, batched=True)
+
+    assert np.allclose(energies, correct_energies, atol=1e-4)
+
+    return
+
+
+def test_single_precision_fallback():
+    """Function that checks that an ill-conditioned S (almost identical states) triggers
+       the warning and the fall back to double precision.
+    """
+    krylov_circs = [tq.gates.Ry(angle=0.3 + k*1.e-4, target=0) + tq.gates.CNOT(0, 1) for k in range(3)]
+    H = tq.paulis.Z(0) + 0.5*tq.paulis.X(1)
+
+    info = {}
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        h, s = batched_krylov_matrices(krylov_circs, H, precision="single", info=info)
+
+    assert any(issubclass(w.category, TequilaWarning) for w in caught)
+    assert info["precision"] == "double"
+    assert np.allclose(s, batched_krylov_matrices(krylov_circs, H)[1])
+
+    return
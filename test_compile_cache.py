@@ -0,0 +1,124 @@
+import numpy as np
+import tequila as tq
+
+from braket import make_overlap
+from compile_cache import CompiledObjectiveCache, abstract_circuit, cached_braket, structural_key
+from krylov import krylov_method
+from random_generators import make_random_hamiltonian
+
+
+def test_structural_key():
+    """Function that checks that circuits differing only in their angles
+       share the same structural key while different structures do not.
+    """
+    U0 = tq.gates.Ry(angle=0.3, target=0) + tq.gates.CNOT(0, 1) + tq.gates.Rz(angle="a", target=1)
+    U1 = tq.gates.Ry(angle=1.2, target=0) + tq.gates.CNOT(0, 1) + tq.gates.Rz(angle="b", target=1)
+    U2 = tq.gates.Rx(angle=0.3, target=0) + tq.gates.CNOT(0, 1) + tq.gates.Rz(angle="a", target=1)
+
+    template0, values0 = abstract_circuit(U0, variables={"a": 0.5})
+    template1, values1 = abstract_circuit(U1, variables={"b": 0.7})
+    template2, _ = abstract_circuit(U2, variables={"a": 0.5})
+
+    assert structural_key(template0) == structural_key(template1)
+    assert structural_key(template0) != structural_key(template2)
+    assert sorted(values0.values()) == [0.3, 0.5]
+
+    return
+
+
+def test_structural_key_gate_attributes():
+    """Function that checks that circuits with the same gates but different Trotter steps
+       have different structural keys and do not share the compiled objectives.
+    """
+    generator = tq.paulis.X(0)*tq.paulis.Y(1) + tq.paulis.Z(0)
+    U0 = tq.gates.Trotterized(generator=generator, angle=1.0, steps=1)
+    U1 = tq.gates.Trotterized(generator=generator, angle=1.0, steps=8)
+    U2 = tq.gates.Ry(angle=0.4, target=0) + tq.gates.H(1)
+
+    assert structural_key(U0) != structural_key(U1)
+    assert structural_key(U0) == structural_key(tq.gates.Trotterized(generator=generator, angle=2.0, steps=1))
+
+    cache = CompiledObjectiveCache()
+    for U in [U0, U1]:
+        real, im = cached_braket(ket=U, bra=U2, cache=cache)
+        objective_real, objective_im = make_overlap(U, U2)
+        assert np.isclose(real + 1.0j*im, tq.simulate(objective_real) + 1.0j*tq.simulate(objective_im), atol=1.e-6)
+    assert cache.misses == 2
+
+    return
+
+
+def test_cached_braket():
+    """Function that checks that the cached overlap agrees with the one
+       of `make_overlap` and that circuits with new angles reuse the compiled objectives.
+    """
+    cache = CompiledObjectiveCache(maxsize=4)
+    for angle in [0.1, 0.7, 2.3]:
+        U0 = tq.gates.Ry(angle=angle, target=0) + tq.gates.CNOT(0, 1)
+        U1 = tq.gates.Rx(angle=2*angle, target=1) + tq.gates.H(0)
+
+        real, im = cached_braket(ket=U0, bra=U1, cache=cache)
+        objective_real, objective_im = make_overlap(U0, U1)
+
+        assert np.isclose(real + 1.0j*im, tq.simulate(objective_real) + 1.0j*tq.simulate(objective_im), atol=1.e-4)
+
+    assert cache.misses == 1
+    assert cache.hits == 2
+    assert len(cache) == 1
+
+    return
+
+
+def test_cache_lru_eviction():
+    """Function that checks that the least recently used entry is removed from a full cache."""
+    cache = CompiledObjectiveCache(maxsize=2)
+    cache.get("a", lambda: 1)
+    cache.get("b", lambda: 2)
+    cache.get("a", lambda: 1)
+    cache.get("c", lambda: 3)
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+
+    return
+
+
+def test_krylov_cache():
+    """Function that checks that `krylov_method` gives the same energies
+       with and without the cache of compiled objectives, also for new angles.
+    """
+    np.random.seed(111)
+    H = make_random_hamiltonian(2, n_ps=3)
+    cache = CompiledObjectiveCache()
+
+    for angles in np.random.rand(2, 2)*np.pi:
+        krylov_circs = [tq.gates.Ry(angle="a", target=0) + tq.gates.CNOT(0, 1),
+                        tq.gates.Rx(angle="b", target=1) + tq.gates.Ry(angle="a", target=0)]
+        variables = {"a": angles[0], "b": angles[1]}
+
+        energies, _ = krylov_method(krylov_circs, H, variables=variables, cache=cache)
+        correct_energies, _ = krylov_method(krylov_circs, H, variables=variables)
+
+        assert np.allclose(energies, correct_energies, atol=1e-4)
+
+    assert cache.hits > 0
+
+    return
+
+
+def test_krylov_cache_positional_args():
+    """Function that checks that positional simulation arguments of `krylov_method`
+       are forwarded to `tq.compile` also with the cache.
+    """
+    np.random.seed(11)
+    H = make_random_hamiltonian(2, n_ps=3)
+    krylov_circs = [tq.gates.Ry(angle=0.3, target=0) + tq.gates.CNOT(0, 1),
+                    tq.gates.Rx(angle=1.1, target=1) + tq.gates.Ry(angle=0.7, target=0)]
+
+    backend = tq.pick_backend()
+    energies, _ = krylov_method(krylov_circs, H, None, False, {}, None, backend, cache=CompiledObjectiveCache())
+    correct_energies, _ = krylov_method(krylov_circs, H, None, False, {}, None, backend)
+
+    assert np.allclose(energies, correct_energies, atol=1e-4)
+
+    return
@@ -0,0 +1,65 @@
+import numpy as np
+import tequila as tq
+
+from braket import braket
+from compression import compress_hamiltonian
+from krylov import krylov_method
+from random_generators import make_random_circuit, make_random_hamiltonian
+
+
+def test_merge_and_drop():
+    """Function that checks that identical Pauli strings are merged,
+       small ones are dropped and the error bound is the sum of the dropped coefficients.
+    """
+    H = tq.QubitHamiltonian("1.0*X(0)Z(1)+0.5*X(0)Z(1)+0.01*Y(1)-0.02*Z(0)+0.3")
+
+    compressed, error_bound = compress_hamiltonian(H, threshold=0.1)
+
+    assert len(compressed.paulistrings) == 2
+    assert np.isclose(error_bound, 0.03)
+    assert np.allclose(compressed.to_matrix(), tq.QubitHamiltonian("1.5*X(0)Z(1)+0.3").to_matrix())
+
+    return
+
+
+def test_transition_error_bound():
+    """Function that checks that the error on a transition element induced
+       by dropping or sampling the small Pauli strings is within the returned bound.
+    """
+    np.random.seed(111)
+    n_qubits = 2
+    U = {k:make_random_circuit(n_qubits) for k in range(2)}
+    H = make_random_hamiltonian(n_qubits, n_ps=6)
+
+    real, im = braket(ket=U[0], bra=U[1], operator=H)
+    trans_el = tq.simulate(real) + 1.0j*tq.simulate(im)
+
+    for sample in [False, True]:
+        compressed, error_bound = compress_hamiltonian(H, threshold=0.5, sample=sample, seed=1)
+        real, im = braket(ket=U[0], bra=U[1], operator=compressed)
+        compressed_trans_el = tq.simulate(real) + 1.0j*tq.simulate(im)
+
+        assert abs(compressed_trans_el - trans_el) <= error_bound + 1.e-6
+
+    info = {}
+    real, im = braket(ket=U[0], bra=U[1], operator=H, threshold=0.5, info=info)
+    assert np.isclose(info["error_bound"], compress_hamiltonian(H, threshold=0.5)[1])
+    assert abs(tq.simulate(real) + 1.0j*tq.simulate(im) - trans_el) <= info["error_bound"] + 1.e-6
+
+    return
+
+
+def test_krylov_compression():
+    """Function that checks that `krylov_method` reports the error bound of the compression."""
+    np.random.seed(111)
+    krylov_circs = [make_random_circuit(2) for i in range(2)]
+    H = tq.QubitHamiltonian("1.0*X(0)Z(1)+0.5*X(0)Z(1)+0.001*Y(1)+0.3*Z(0)")
+
+    info = {}
+    energies, _ = krylov_method(krylov_circs, H, threshold=0.01, info=info)
+    correct_energies, _ = krylov_method(krylov_circs, H)
+
+    assert np.isclose(info["error_bound"], 0.001)
+    assert np.allclose(energies, correct_energies, atol=2*info["error_bound"]*len(krylov_circs))
+
+    return
@@ -0,0 +1,96 @@
+import pytest
+import numpy as np
+import tequila as tq
+from tequila import TequilaException
+
+from braket import braket
+from deduplication import simulate_deduplicated
+from krylov import krylov_method
+from random_generators import make_random_circuit, make_random_hamiltonian
+
+
+def test_simulate_deduplicated():
+    """Function that compares the deduplicated evaluation of objectives with `tq.simulate`,
+       with an operator acting also on qubits that are not in the circuits.
+    """
+    np.random.seed(111)
+    U0 = make_random_circuit(3, enable_controls=True)
+    U1 = make_random_circuit(3)
+    H = make_random_hamiltonian(5, n_ps=4) + 0.3
+
+    real, im = braket(ket=U0, bra=U1, operator=H)
+    overlap_real, overlap_im = braket(ket=U0, bra=U1)
+    expectation_value = braket(ket=U0, operator=H)
+
+    info = {}
+    values = simulate_deduplicated([real, im, overlap_real, overlap_im, expectation_value], info=info)
+    correct_values = [tq.simulate(objective) for objective in [real, im, overlap_real, overlap_im, expectation_value]]
+
+    assert np.allclose(values, correct_values, atol=1.e-8)
+    # X and Y of every Hadamard test share the circuit, and the identity string the one of the overlap
+    assert info["expectation_values"] == 2*len(H.paulistrings) + 2 + 1
+    assert info["simulated_circuits"] == len(H.paulistrings) + 1
+
+    return
+
+
+def test_krylov_deduplicated():
+    """Function that checks that the Krylov energies do not change with the deduplication
+       and that the number of simulated circuits is reduced.
+    """
+    np.random.seed(11)
+    krylov_circs = [make_random_circuit(3, enable_controls=True) for i in range(3)]
+    H = make_random_hamiltonian(3, n_ps=4) + 0.5
+
+    info = {}
+    energies, _ = krylov_method(krylov_circs, H, info=info)
+    correct_energies, _ = krylov_method(krylov_circs, H, deduplicate=False)
+
+    assert np.allclose(energies, correct_energies, atol=1e-8)
+    assert info["simulated_circuits"] < info["expectation_values"]
+
+    return
+
+
+def test_deduplicated_gate_attributes():
+    """Function that checks that circuits with the same gates but different Trotter steps
+       are simulated separately.
+    """
+    generator = tq.paulis.X(0)*tq.paulis.Y(1) + tq.paulis.Z(0)
+    U0 = tq.gates.Trotterized(generator=generator, angle=1.0, steps=1)
+    U1 = tq.gates.Trotterized(generator=generator, angle=1.0, steps=8)
+    U2 = tq.gates.Ry(angle=0.4, target=0) + tq.gates.H(1)
+
+    objectives = list(braket(ket=U0, bra=U2)) + list(braket(ket=U1, bra=U2))
+    info = {}
+    values = simulate_deduplicated(objectives, info=info)
+    correct_values = [tq.simulate(objective) for objective in objectives]
+
+    assert np.allclose(values, correct_values, atol=1.e-8)
+    assert info["simulated_circuits"] == 2
+
+    return
+
+
+def test_deduplicated_samples():
+    """Function that checks that samples given positionally disable the deduplication in `krylov_method`
+       and are rejected by `simulate_deduplicated`.
+    """
+    np.random.seed(2)
+    krylov_circs = [make_random_circuit(2) for i in range(2)]
+    H = make_random_hamiltonian(2, n_ps=3)
+    real, im = braket(ket=krylov_circs[0], bra=krylov_circs[1])
+
+    with pytest.raises(TequilaException):
+        simulate_deduplicated([real, im], None, 100)
+    with pytest.raises(TequilaException):
+        simulate_deduplicated([real, im], noise=tq.circuit.noise.BitFlip(0.1, 1))
+
+    info = {}
+    energies, _ = krylov_method(krylov_circs, H, None, False, None, 20000, info=info)
+    correct_energies, _ = krylov_method(krylov_circs, H)
+
+    assert "simulated_circuits" not in info
+    assert np.allclose(energies, correct_energies, atol=0.1)
+
+    return
@@ -0,0 +1,96 @@
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+import pytest
+import numpy as np
+from tequila import TequilaException
+
+from batched_simulator import batched_krylov_matrices
+from distributed import KrylovWorker, distributed_krylov_matrices
+from krylov import krylov_method
+from random_generators import make_random_circuit, make_random_hamiltonian
+
+
+AUTHKEY = b"krylov test"
+
+
+def start_failing_worker() -> tuple:
+    """Worker that accepts the circuits and one task, then disconnects without answering."""
+    server = Listener(("localhost", 0), authkey=AUTHKEY)
+
+    def serve():
+        connection = server.accept()
+        connection.recv()
+        connection.recv()
+        connection.close()
+        server.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return server.address
+
+
+def test_distributed_krylov_matrices():
+    """Function that computes the Krylov matrices on three localhost workers and a failing one,
+       and compares them with the batched wavefunctions.
+    """
+    np.random.seed(111)
+    krylov_circs = [make_random_circuit(3, enable_controls=True) for i in range(3)]
+    H = make_random_hamiltonian(4, n_ps=5)
+    operators = {(i, j): H for i in range(3) for j in range(i, 3)}
+    overlaps = {(i, j): True for i in range(3) for j in range(i + 1, 3)}
+
+    workers = [KrylovWorker(authkey=AUTHKEY) for k in range(3)]
+    for worker in workers:
+        worker.start()
+    addresses = [worker.address for worker in workers] + [start_failing_worker()]
+
+    info = {}
+    h, s = distributed_krylov_matrices(krylov_circs, operators, overlaps, addresses, authkey=AUTHKEY,
+                                       block_size=2, info=info)
+    correct_h, correct_s = batched_krylov_matrices(krylov_circs, H)
+
+    assert np.allclose(h, correct_h, atol=1.e-6)
+    assert np.allclose(s, correct_s, atol=1.e-6)
+    assert info["redispatched"] >= 1
+    assert sum(info["tasks_per_worker"].values()) == info["tasks"] == 6*3 + 3
+
+    energies, _ = krylov_method(krylov_circs, H, workers=[worker.address for worker in workers],
+                                  authkey=AUTHKEY)
+    correct_energies, _ = krylov_method(krylov_circs, H, batched=True)
+    assert np.allclose(energies, correct_energies, atol=1.e-6)
+
+    for worker in workers:
+        worker.shutdown()
+
+    return
+
+
+def test_distributed_authentication():
+    """Function that checks that coordinators with a wrong authkey are rejected
+       and that the worker keeps serving the authenticated ones.
+    """
+    np.random.seed(11)
+    krylov_circs = [make_random_circuit(2) for i in range(2)]
+    H = make_random_hamiltonian(2, n_ps=3)
+    operators = {(i, j): H for i in range(2) for j in range(i, 2)}
+    overlaps = {(0, 1): True}
+
+    worker = KrylovWorker(authkey=AUTHKEY)
+    worker.start()
+    assert worker.address[0] == "127.0.0.1"
+
+    with pytest.raises(AuthenticationError):
+        Client(worker.address, authkey=b"wrong key")
+    with pytest.raises(TequilaException):
+        distributed_krylov_matrices(krylov_circs, operators, overlaps, [worker.address], authkey=b"wrong key")
+    with pytest.raises(TequilaException):
+        KrylovWorker(authkey=None)
+
+    h, s = distributed_krylov_matrices(krylov_circs, operators, overlaps, [worker.address], authkey=AUTHKEY)
+    correct_h, correct_s = batched_krylov_matrices(krylov_circs, H)
+    assert np.allclose(h, correct_h, atol=1.e-6)
+    assert np.allclose(s, correct_s, atol=1.e-6)
+
+    worker.shutdown()
+
+    return
@@ -0,0 +1,113 @@
+import time
+import asyncio
+import itertools as it
+import numpy as np
+import tequila as tq
+from tequila.hamiltonian.qubit_hamiltonian import QubitHamiltonian
+
+from braket import make_transition
+from krylov_async import SimulatorBackend, braket_async, krylov_method_async
+from random_generators import make_random_circuit, make_random_hamiltonian
+
+
+class CountingBackend(SimulatorBackend):
+    """Stand-in backend that records how many jobs are in flight at the same time."""
+
+    def __init__(self, latency: float = 0.0, *args, **kwargs):
+        super().__init__(latency, *args, **kwargs)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.n_jobs = 0
+
+    async def submit(self, objective) -> float:
+        self.in_flight += 1
+        self.n_jobs += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await super().submit(objective)
+        finally:
+            self.in_flight -= 1
+
+
+class FlakyBackend(SimulatorBackend):
+    """Stand-in backend in which the first submission of every objective fails."""
+
+    def __init__(self, latency: float = 0.0, *args, **kwargs):
+        super().__init__(latency, *args, **kwargs)
+        self.failed = set()
+
+    async def submit(self, objective) -> float:
+        if id(objective) not in self.failed:
+            self.failed.add(id(objective))
+            raise ConnectionError("job lost")
+        return await super().submit(objective)
+
+
+def test_braket_async_transition():
+    """Function that tests that the transition element collected asynchronously
+       agrees with the one obtained by simulating the objectives of `make_transition`.
+    """
+    np.random.seed(111)
+    n_qubits = 2
+    U = {k:make_random_circuit(n_qubits) for k in range(2)}
+    H = make_random_hamiltonian(n_qubits, n_ps=3)
+
+    trans_real, trans_im = make_transition(U0=U[0], U1=U[1], H=H)
+    correct_trans_el = tq.simulate(trans_real) + 1.0j*tq.simulate(trans_im)
+
+    real, im = asyncio.run(braket_async(ket=U[0], bra=U[1], operator=H))
+
+    assert np.isclose(correct_trans_el, real + 1.0j*im, atol=1.e-4)
+
+    return
+
+
+def test_krylov_async_latency(n_krylov_states: int=2):
+    """Function that applies the asynchronous Krylov method on a backend with
+       high latency and checks that the jobs are executed concurrently
+       (in a time much smaller than one round trip per job) and within the in-flight limit.
+
+    Args:
+        n_krylov_states (int, optional): Number of Krylov states. Defaults to 2.
+    """
+    np.random.seed(111)
+    krylov_circs = [make_random_circuit(2, enable_controls=True) for i in range(n_krylov_states)]
+
+    krylov_states = [tq.simulate(circ) for circ in krylov_circs]
+    H = QubitHamiltonian()
+    for i, j in it.product(krylov_states, repeat=2):
+        H -= tq.paulis.KetBra(ket = i, bra = j)
+
+    latency = 0.5
+    backend = CountingBackend(latency)
+    start = time.time()
+    kry_energies, _ = asyncio.run(krylov_method_async(krylov_circs, H, backend=backend, max_in_flight=64))
+    elapsed = time.time() - start
+
+    eigenvalues = np.linalg.eigvalsh(H.to_matrix())
+
+    assert np.isclose(kry_energies[0], eigenvalues[0], atol=1e-4)
+    assert 1 < backend.max_in_flight <= 64
+    assert elapsed < 0.5*latency*backend.n_jobs
+
+    backend = CountingBackend(0.01)
+    asyncio.run(krylov_method_async(krylov_circs, H, backend=backend, max_in_flight=3))
+    assert backend.max_in_flight <= 3
+
+    return
+
+
+def test_krylov_async_retries():
+    """Function that checks that failed jobs are resubmitted
+       and the Krylov energies are still correct.
+    """
+    np.random.seed(11)
+    krylov_circs = [make_random_circuit(2) for i in range(2)]
+    H = make_random_hamiltonian(2, n_ps=2)
+
+    energies, _ = asyncio.run(krylov_method_async(krylov_circs, H, backend=FlakyBackend(), retry_delay=0.0))
+    correct_energies, _ = asyncio.run(krylov_method_async(krylov_circs, H))
+
+    assert np.allclose(energies, correct_energies, atol=1e-4)
+
+    return
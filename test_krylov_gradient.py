@@ -0,0 +1,57 @@
+import numpy as np
+import tequila as tq
+
+from krylov import krylov_method
+from krylov_gradient import krylov_energy, krylov_gradient
+from random_generators import make_random_hamiltonian
+
+
+def test_krylov_gradient():
+    """Function that compares the analytic gradient of the Krylov ground state
+       energy with central finite differences of `krylov_method`.
+    """
+    np.random.seed(111)
+    H = make_random_hamiltonian(2, n_ps=4)
+    krylov_circs = [tq.gates.Ry(angle="a", target=0) + tq.gates.CNOT(0, 1),
+                    tq.gates.Rx(angle="b", target=1) + tq.gates.Ry(angle="a", target=0) + tq.gates.Rz(angle="c", target=1)]
+    variables = {"a": 0.4, "b": 1.3, "c": -0.7}
+
+    energy, gradient = krylov_gradient(krylov_circs, H, variables)
+
+    assert np.isclose(energy, krylov_method(krylov_circs, H, variables=variables)[0][0], atol=1e-6)
+    assert len(gradient) == 3
+
+    step = 1.e-4
+    for parameter, derivative in gradient.items():
+        shifted = dict(variables)
+        shifted[parameter.name] = variables[parameter.name] + step
+        energy_plus = krylov_method(krylov_circs, H, variables=shifted)[0][0]
+        shifted[parameter.name] = variables[parameter.name] - step
+        energy_minus = krylov_method(krylov_circs, H, variables=shifted)[0][0]
+
+        assert np.isclose(derivative, (energy_plus - energy_minus)/(2*step), atol=1e-4)
+
+    return
+
+
+def test_krylov_energy_objective():
+    """Function that checks that the Krylov energy objective and its `tq.grad` agree with
+       `krylov_gradient`, also with positional simulation arguments, and that it can be minimized.
+    """
+    np.random.seed(11)
+    H = make_random_hamiltonian(2, n_ps=4)
+    krylov_circs = [tq.gates.Ry(angle="a", target=0) + tq.gates.CNOT(0, 1),
+                    tq.gates.Rx(angle="b", target=1) + tq.gates.Ry(angle="a", target=0)]
+    variables = {"a": 0.4, "b": 1.3}
+
+    energy, gradient = krylov_gradient(krylov_circs, H, variables, False, None, tq.pick_backend())
+    objective = krylov_energy(krylov_circs, H)
+
+    assert np.isclose(tq.simulate(objective, variables=variables), energy, atol=1e-6)
+    for parameter, derivative in gradient.items():
+        assert np.isclose(tq.simulate(tq.grad(objective, parameter), variables=variables), derivative, atol=1e-6)
+
+    result = tq.minimize(objective, initial_values=variables, method="bfgs", maxiter=5, silent=True)
+    assert result.energy < energy
+
+    return
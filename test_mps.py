@@ -0,0 +1,81 @@
+import numpy as np
+import tequila as tq
+
+from braket import braket, make_overlap, make_transition
+from krylov import krylov_method
+from mps import mps_braket, simulate_mps
+from random_generators import make_random_circuit, make_random_hamiltonian
+
+
+def make_long_range_circuit(angles: list) -> tq.QCircuit:
+    """Circuit with gates on non-adjacent qubits, in both orders, and controlled rotations."""
+    U = tq.gates.Ry(angle=angles[0], target=0) + tq.gates.H(2) + tq.gates.CNOT(0, 3)
+    U += tq.gates.Rz(angle=angles[1], target=1, control=3) + tq.gates.ExpPauli(paulistring="X(3)Y(0)", angle=angles[2])
+    U += tq.gates.Rx(angle=angles[3], target=2, control=[0, 3]) + tq.gates.SWAP(1, 3)
+    return U
+
+
+def test_random_mps_braket():
+    """Function that compares overlaps, expectation values and transition elements
+       computed with matrix product states with the ones obtained by simulating the objectives.
+    """
+    np.random.seed(111)
+    H = make_random_hamiltonian(4, n_ps=4)
+    for k in range(2):
+        U = [make_long_range_circuit(np.random.rand(4)*np.pi), make_random_circuit(3, enable_controls=True)]
+
+        info = {}
+        real, im = mps_braket(ket=U[0], bra=U[1], info=info)
+        objective_real, objective_im = make_overlap(U[0], U[1])
+        assert np.isclose(real + 1.0j*im, tq.simulate(objective_real) + 1.0j*tq.simulate(objective_im), atol=1.e-6)
+        assert info["truncation_error"] < 1.e-12
+
+        real, im = braket(ket=U[0], bra=U[1], operator=H, mps=True)
+        trans_real, trans_im = make_transition(U0=U[0], U1=U[1], H=H)
+        assert np.isclose(real + 1.0j*im, tq.simulate(trans_real) + 1.0j*tq.simulate(trans_im), atol=1.e-6)
+
+        value = braket(ket=U[0], operator=H, mps=True)
+        assert np.isclose(value, tq.simulate(tq.ExpectationValue(H=H, U=U[0])), atol=1.e-6)
+
+    return
+
+
+def test_mps_truncation():
+    """Function that checks that a GHZ state on 60 qubits has bond dimension 2, and that
+       limiting the bond dimension of an entangled state reports a truncation error.
+    """
+    U = tq.gates.H(0)
+    for q in range(59):
+        U += tq.gates.CNOT(q, q + 1)
+    state = simulate_mps(U, max_bond_dimension=4)
+    assert state.bond_dimension == 2
+    assert state.truncation_error < 1.e-12
+    assert np.isclose(state.transition(state, tq.paulis.X(list(range(60)))), 1.0)
+
+    np.random.seed(11)
+    U = make_random_circuit(6, enable_controls=True, n_rotations=30)
+    U += tq.gates.CNOT(1, 6) + tq.gates.CNOT(2, 5)
+    exact = simulate_mps(U)
+    truncated = simulate_mps(U, max_bond_dimension=1)
+    assert truncated.bond_dimension == 1
+    assert truncated.truncation_error > 1.e-6
+    assert np.isclose(abs(exact.inner(exact)), 1.0)
+    assert np.isclose(abs(truncated.inner(truncated)), 1.0)
+
+    return
+
+
+def test_krylov_mps():
+    """Function that checks that the Krylov energies with matrix product states are the ones of the wavefunctions."""
+    np.random.seed(111)
+    krylov_circs = [make_long_range_circuit(np.random.rand(4)*np.pi) + make_random_circuit(3) for i in range(3)]
+    H = make_random_hamiltonian(4, n_ps=4)
+
+    info = {}
+    energies, _ = krylov_method(krylov_circs, H, mps=True, info=info)
+    correct_energies, _ = krylov_method(krylov_circs, H, batched=True)
+
+    assert np.allclose(energies, correct_energies, atol=1e-6)
+    assert info["truncation_error"] < 1.e-12
+
+    return
@@ -0,0 +1,73 @@
+import pytest
+import numpy as np
+import tequila as tq
+from tequila import TequilaException
+from tequila.objective.objective import BraKetImpl
+
+from braket import braket, make_overlap
+from random_generators import make_random_circuit
+
+
+def test_overlap_magnitude():
+    """Function that compares the ancilla-free squared magnitude of the overlap with the
+       one of the Hadamard test, also when sampling, and checks that no qubit is added to the circuit.
+    """
+    np.random.seed(111)
+    for k in range(3):
+        U0 = make_random_circuit(3, enable_controls=True)
+        U1 = make_random_circuit(4, enable_controls=True)
+
+        magnitude = braket(ket=U0, bra=U1, magnitude_only=True)
+        objective_real, objective_im = make_overlap(U0, U1)
+        overlap = tq.simulate(objective_real) + 1.0j*tq.simulate(objective_im)
+
+        assert np.isclose(tq.simulate(magnitude), abs(overlap)**2, atol=1.e-6)
+        assert np.isclose(tq.simulate(magnitude, samples=10000), abs(overlap)**2, atol=0.05)
+        assert set(magnitude.args[0].ket.qubits) == set(U0.qubits) | set(U1.qubits)
+
+    assert braket(ket=U0, magnitude_only=True) == 1.0
+
+    return
+
+
+def test_overlap_magnitude_parametrized():
+    """Function that checks the squared magnitude of the overlap of parametrized circuits and its gradient."""
+    U0 = tq.gates.Ry(angle="a", target=0) + tq.gates.CNOT(0, 1)
+    U1 = tq.gates.H(0) + tq.gates.CNOT(0, 1)
+
+    magnitude = braket(ket=U0, bra=U1, magnitude_only=True)
+    gradient = tq.grad(magnitude, "a")
+
+    for a in [0.0, 0.7, np.pi/2]:
+        assert np.isclose(tq.simulate(magnitude, variables={"a": a}), np.cos(a/2 - np.pi/4)**2, atol=1.e-6)
+        assert np.isclose(tq.simulate(gradient, variables={"a": a}), -np.sin(a - np.pi/2)/2, atol=1.e-6)
+
+    return
+
+
+def test_overlap_magnitude_large():
+    """Function that checks the squared magnitude of the overlap of 14 qubit states,
+       whose all-zero projector would have 2^14 Pauli strings, and that no operator is built.
+    """
+    n_qubits = 14
+    U0 = tq.QCircuit()
+    U1 = tq.QCircuit()
+    for q in range(n_qubits):
+        U0 += tq.gates.Ry(angle=0.1*(q + 1), target=q)
+        U1 += tq.gates.Ry(angle=0.1*(q + 1) + 0.2, target=q)
+
+    magnitude = braket(ket=U0, bra=U1, magnitude_only=True)
+
+    assert len(magnitude.args) == 1 and isinstance(magnitude.args[0], BraKetImpl)
+    assert magnitude.args[0].operator is None
+    assert np.isclose(tq.simulate(magnitude), np.cos(0.1)**(2*n_qubits), atol=1.e-6)
+
+    return
+
+
+def test_overlap_magnitude_operator():
+    """Function that checks that magnitude_only can not be used with an operator."""
+    with pytest.raises(TequilaException):
+        braket(ket=tq.gates.H(0), bra=tq.gates.X(0), operator=tq.paulis.Z(0), magnitude_only=True)
+
+    return
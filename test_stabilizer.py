@@ -0,0 +1,123 @@
+import time
+import pytest
+import numpy as np
+import tequila as tq
+from tequila import TequilaException
+
+from braket import braket, make_overlap, make_transition
+from compile_cache import CompiledObjectiveCache
+from krylov import krylov_method
+from stabilizer import is_clifford, stabilizer_braket
+
+
+def make_random_clifford_circuit(n_qubits: int, n_gates: int) -> tq.QCircuit:
+    """Circuit with random H, S, CNOT, CZ, Pauli gates and rotations by multiples of pi/2."""
+    U = tq.QCircuit()
+    for i in range(n_gates):
+        q = np.random.randint(n_qubits)
+        other = (q + np.random.randint(1, n_qubits)) % n_qubits
+        angle = np.pi/2*np.random.randint(1, 4)
+        U += np.random.choice([lambda: tq.gates.H(q), lambda: tq.gates.S(q), lambda: tq.gates.CNOT(q, other),
+                               lambda: tq.gates.CZ(q, other), lambda: tq.gates.Y(q),
+                               lambda: tq.gates.Rx(angle, q), lambda: tq.gates.Ry(angle, q),
+                               lambda: tq.gates.Rz(angle, q)])()
+    return U
+
+
+def test_is_clifford():
+    """Function that checks the detection of Clifford circuits."""
+    assert is_clifford(tq.gates.H(0) + tq.gates.CNOT(0, 1) + tq.gates.Rz(angle=np.pi/2, target=1))
+    assert not is_clifford(tq.gates.T(0))
+    assert not is_clifford(tq.gates.Ry(angle="a", target=0))
+    assert is_clifford(tq.gates.Ry(angle="a", target=0), variables={"a": np.pi})
+
+    return
+
+
+def test_random_stabilizer_braket():
+    """Function that compares overlaps, expectation values and transition elements
+       of random Clifford circuits with the ones obtained by simulating the objectives.
+    """
+    np.random.seed(111)
+    H = tq.QubitHamiltonian("0.7*X(0)Y(1)+0.3*Z(2)X(0)-0.2*Y(2)+0.1")
+    for k in range(3):
+        U = {k:make_random_clifford_circuit(3, 12) for k in range(2)}
+
+        real, im = stabilizer_braket(ket=U[0], bra=U[1])
+        objective_real, objective_im = make_overlap(U[0], U[1])
+        assert np.isclose(real + 1.0j*im, tq.simulate(objective_real) + 1.0j*tq.simulate(objective_im), atol=1.e-4)
+
+        real, im = stabilizer_braket(ket=U[0], bra=U[1], operator=H)
+        trans_real, trans_im = make_transition(U0=U[0], U1=U[1], H=H)
+        assert np.isclose(real + 1.0j*im, tq.simulate(trans_real) + 1.0j*tq.simulate(trans_im), atol=1.e-4)
+
+        value = braket(ket=U[0], operator=H, stabilizer=True)
+        assert np.isclose(value, tq.simulate(tq.ExpectationValue(H=H, U=U[0])), atol=1.e-4)
+
+    return
+
+
+def test_krylov_stabilizer():
+    """Function that checks that Clifford Krylov circuits give the same energies
+       with the stabilizer formalism and with the objectives.
+    """
+    np.random.seed(11)
+    krylov_circs = [make_random_clifford_circuit(2, 6) for i in range(3)]
+    H = tq.QubitHamiltonian("1.0*X(0)X(1)+0.5*Z(0)-0.3*Y(1)+0.2*Z(0)Z(1)")
+
+    energies, _ = krylov_method(krylov_circs, H)
+    correct_energies, _ = krylov_method(krylov_circs, H, stabilizer=False)
+
+    assert np.allclose(energies, correct_energies, atol=1e-4)
+
+    return
+
+
+def test_large_stabilizer_braket(n_qubits: int=120):
+    """Function that checks overlaps and transition elements of GHZ states on many qubits."""
+    ghz = tq.gates.H(0)
+    for q in range(n_qubits - 1):
+        ghz += tq.gates.CNOT(q, q+1)
+    zero = tq.QCircuit()
+    X = tq.QubitHamiltonian.from_paulistrings([tq.PauliString(data={q: "X" for q in range(n_qubits)})])
+
+    real, im = stabilizer_braket(ket=ghz, bra=zero)
+    assert np.isclose(real + 1.0j*im, 1/np.sqrt(2))
+    assert np.isclose(stabilizer_braket(ket=ghz, operator=X), 1.0)
+
+    return
+
+
+def test_is_clifford_large_gates():
+    """Function that checks that non-Clifford gates on many qubits are rejected without
+       building their matrices, and that Clifford gates on several qubits are recognized.
+    """
+    start = time.time()
+    assert not is_clifford(tq.gates.X(target=0, control=[1, 2, 3, 4, 5, 6, 7]))
+    assert not is_clifford(tq.gates.ExpPauli(paulistring="X(0)Y(1)Z(2)X(3)Y(4)Z(5)X(6)X(7)X(8)X(9)", angle=0.3))
+    assert not is_clifford(tq.gates.S(target=0, control=1))
+    assert time.time() - start < 1.0
+
+    assert is_clifford(tq.gates.ExpPauli(paulistring="X(0)Y(1)Z(2)X(3)Y(4)Z(5)", angle=np.pi/2))
+    assert is_clifford(tq.gates.Z(target=0, control=1))
+
+    return
+
+
+def test_krylov_stabilizer_cache():
+    """Function that checks that an explicit cache disables the automatic stabilizer path,
+       and that asking for both raises an error.
+    """
+    krylov_circs = [tq.gates.H(0) + tq.gates.CNOT(0, 1), tq.gates.X(0) + tq.gates.H(1)]
+    H = tq.QubitHamiltonian("1.0*X(0)X(1)+0.5*Z(0)")
+    cache = CompiledObjectiveCache()
+
+    energies, _ = krylov_method(krylov_circs, H, cache=cache)
+    correct_energies, _ = krylov_method(krylov_circs, H, stabilizer=True)
+
+    assert cache.misses > 0
+    assert np.allclose(energies, correct_energies, atol=1e-4)
+    with pytest.raises(TequilaException):
+        krylov_method(krylov_circs, H, stabilizer=True, cache=cache)
+
+    return
@@ -0,0 +1,76 @@
+import numpy as np
+import tequila as tq
+
+from braket import braket
+from krylov import krylov_method
+from random_generators import make_random_hamiltonian
+from symmetry import detect_symmetries, screen_operator, symmetry_sector
+
+
+def make_number_conserving_circuit(occupied: list, angles: list) -> tq.QCircuit:
+    """Circuit preparing a state with fixed number of excitations on 4 qubits."""
+    U = tq.gates.X(target=occupied)
+    U += tq.gates.QubitExcitation(angle=angles[0], target=[0, 2])
+    U += tq.gates.QubitExcitation(angle=angles[1], target=[1, 3])
+    return U
+
+
+def test_symmetry_sector():
+    """Function that checks the sectors assigned to simple circuits."""
+    U = tq.gates.X(target=0) + tq.gates.Rz(angle=0.3, target=1) + tq.gates.CNOT(1, 2)
+
+    assert symmetry_sector(U, "Z(0)Z(1)") == -1
+    assert symmetry_sector(U, "Z(1)") == 1
+    assert symmetry_sector(U, "Z(0)Z(1)Z(2)") is None
+    assert symmetry_sector(U + tq.gates.Ry(angle=0.3, target=1), "Z(1)") is None
+    assert symmetry_sector(U + tq.gates.Rx(angle=np.pi, target=1), "Z(1)") == -1
+    assert symmetry_sector(U, "X(0)") is None
+
+    # the coefficient of the generator rescales the angle: exp(-i angle/4 X)
+    for angle, sector in [(np.pi, None), (2*np.pi, -1), (4*np.pi, 1)]:
+        V = tq.gates.GeneralizedRotation(angle=angle, generator=0.5*tq.paulis.X(0))
+        assert symmetry_sector(V, "Z(0)") == sector
+        if sector is not None:
+            assert np.isclose(tq.simulate(tq.ExpectationValue(H=tq.paulis.Z(0), U=V)), sector)
+
+    return
+
+
+def test_screen_operator():
+    """Function that checks that the screened Pauli strings have zero transition elements."""
+    U0 = make_number_conserving_circuit([0], [0.4, 1.1])
+    U1 = make_number_conserving_circuit([0, 1], [0.9, -0.3])
+    symmetries = detect_symmetries([U0, U1])
+    sectors = [tuple(symmetry_sector(U, symmetry) for symmetry in symmetries) for U in [U0, U1]]
+
+    H = tq.QubitHamiltonian("1.0*X(0)X(1)+0.5*Z(0)Z(2)+0.3*Y(1)X(3)+0.2*Z(3)")
+    screened = screen_operator(H, sectors[0], sectors[1], symmetries)
+
+    assert len(screened.paulistrings) < len(H.paulistrings)
+    for ps in H.paulistrings:
+        if ps in screened.paulistrings:
+            continue
+        real, im = braket(ket=U0, bra=U1, operator=tq.QubitHamiltonian.from_paulistrings([ps]))
+        assert np.isclose(tq.simulate(real) + 1.0j*tq.simulate(im), 0.0, atol=1.e-6)
+
+    return
+
+
+def test_krylov_symmetries():
+    """Function that checks that symmetry screening in `krylov_method`
+       skips terms and elements without changing the energies.
+    """
+    np.random.seed(111)
+    H = make_random_hamiltonian(4, n_ps=4) + tq.QubitHamiltonian("0.5*X(0)X(1)+0.3*Z(0)Z(2)")
+    krylov_circs = [make_number_conserving_circuit([0], [0.4, 1.1]),
+                    make_number_conserving_circuit([0, 1], [0.9, -0.3])]
+
+    info = {}
+    energies, _ = krylov_method(krylov_circs, H, symmetries="auto", info=info)
+    correct_energies, _ = krylov_method(krylov_circs, H)
+
+    assert np.allclose(energies, correct_energies, atol=1e-4)
+    assert info["screened_terms"] > 0
+    assert info["screened_overlaps"] > 0
+
+    return